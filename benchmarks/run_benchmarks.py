@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Time the simulation, Hamiltonian, optimizer and rendering hot paths, headless.
+
+    python benchmarks/run_benchmarks.py run -o results.json
+    python benchmarks/run_benchmarks.py run -o results.json --baseline baseline.json
+    python benchmarks/run_benchmarks.py compare baseline.json results.json
+
+The number of qubits is fixed when vqe_playground is imported, so each qubit
+count is benchmarked in its own process. Benchmarks whose optional
+dependencies aren't installed are listed as skipped rather than failing the
+run, but any other import failure is an error.
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_QUBITS = [3, 5, 7]
+DEFAULT_LAYERS = [1, 2, 4]
+DEFAULT_REPEAT = 10
+
+# A benchmark regresses when its median time grows by more than this fraction
+DEFAULT_THRESHOLD = 0.2
+
+# Versions recorded with the results, so that upgrades can be told apart
+VERSIONED_PACKAGES = ['numpy', 'pygame', 'networkx', 'qiskit', 'scipy', 'matplotlib']
+
+# Packages that vqe_playground can run without, so benchmarks that need them are skipped when they are missing
+OPTIONAL_PACKAGES = ['qiskit', 'scipy', 'matplotlib']
+
+WINDOW_SIZE = 1650, 950
+
+
+def time_call(func, repeat, setup=None):
+    """Seconds taken by each of repeat calls of func, after one untimed call, running setup before each"""
+    timings = []
+    for run_num in range(repeat + 1):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        if run_num > 0:
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def initial_adj_matrix(num_nodes):
+    """A graph with weights from 0 to 3 between every pair of nodes, the same for every run"""
+    weights = np.triu(np.random.default_rng(num_nodes).integers(0, 4, (num_nodes, num_nodes)), 1)
+    return weights + weights.T
+
+
+def randomize_rotations(circuit_grid_model, rng):
+    for node in circuit_grid_model.get_rotation_gate_nodes():
+        circuit_grid_model.set_node_radians(node.wire_num, node.column_num, rng.uniform(0, 2 * np.pi))
+
+
+def bench_compute_circuit(num_qubits, num_layers, repeat, rng):
+    from vqe_playground.model.ansatz import create_ansatz_model
+    model = create_ansatz_model(num_qubits, num_layers)
+    return time_call(model.compute_circuit, repeat, lambda: randomize_rotations(model, rng))
+
+
+def bench_compute_statevector(num_qubits, num_layers, repeat, rng):
+    from vqe_playground.model.ansatz import create_ansatz_model
+    model = create_ansatz_model(num_qubits, num_layers)
+    return time_call(model.compute_statevector, repeat, lambda: randomize_rotations(model, rng))
+
+
+def bench_expectation_grid_set_circuit(num_qubits, num_layers, repeat, rng):
+    from vqe_playground.model.ansatz import create_ansatz_model
+    from vqe_playground.viz.expectation_grid import ExpectationGrid
+    model = create_ansatz_model(num_qubits, num_layers)
+    expectation_grid = ExpectationGrid(model.compute_circuit(), initial_adj_matrix(num_qubits))
+    circuits = []
+
+    def setup():
+        randomize_rotations(model, rng)
+        circuits[:] = [model.compute_circuit()]
+
+    return time_call(lambda: expectation_grid.set_circuit(circuits[0]), repeat, setup)
+
+
+def bench_optimize(num_qubits, num_layers, repeat, rng):
+    """A full hill-climbing optimization, as run by the Optimize button"""
+    from vqe_playground.model.ansatz import create_ansatz_model
+    from vqe_playground.optimization import CoordinateSearch
+    from vqe_playground.sim.maxcut import maxcut_diagonal
+    model = create_ansatz_model(num_qubits, num_layers)
+    eigenvalues, _ = maxcut_diagonal(initial_adj_matrix(num_qubits))
+    num_rotations = len(model.get_rotation_gate_nodes())
+
+    def optimize():
+        CoordinateSearch(np.full(num_rotations, np.pi)).minimize(model.get_gate_tape(), eigenvalues)
+
+    return time_call(optimize, repeat)
+
+
+def bench_circuit_grid_update(num_qubits, num_layers, repeat, rng):
+    """Redrawing the circuit grid after every rotation has changed, as during optimization"""
+    from vqe_playground.controls.circuit_grid import CircuitGrid
+    from vqe_playground.model.ansatz import create_ansatz_model
+    model = create_ansatz_model(num_qubits, num_layers)
+    circuit_grid = CircuitGrid(10, 540, model)
+    return time_call(circuit_grid.update, repeat, lambda: randomize_rotations(model, rng))
+
+
+def bench_expectation_grid_set_adj_matrix(num_qubits, repeat, rng):
+    from vqe_playground.model.ansatz import create_ansatz_model
+    from vqe_playground.viz.expectation_grid import ExpectationGrid
+    adj_matrix = initial_adj_matrix(num_qubits)
+    expectation_grid = ExpectationGrid(create_ansatz_model(num_qubits).compute_circuit(), adj_matrix)
+    return time_call(lambda: expectation_grid.set_adj_matrix(adj_matrix), repeat)
+
+
+def bench_calc_expectation_value(num_qubits, repeat, rng):
+    from vqe_playground.model.ansatz import create_ansatz_model
+    from vqe_playground.viz.expectation_grid import ExpectationGrid
+    expectation_grid = ExpectationGrid(create_ansatz_model(num_qubits).compute_circuit(),
+                                       initial_adj_matrix(num_qubits))
+    return time_call(expectation_grid.calc_expectation_value, repeat)
+
+
+def bench_network_graph_set_solution(num_qubits, repeat, rng):
+    from vqe_playground.viz.network_graph import NetworkGraph
+    network_graph = NetworkGraph(initial_adj_matrix(num_qubits))
+    solutions = []
+
+    def setup():
+        solutions[:] = [rng.integers(0, 2, num_qubits)]
+
+    return time_call(lambda: network_graph.set_solution(solutions[0]), repeat, setup)
+
+
+# Benchmarks that depend on the depth of the ansatz, and those that don't
+LAYERED_BENCHMARKS = {
+    'CircuitGridModel.compute_circuit': bench_compute_circuit,
+    'CircuitGridModel.compute_statevector': bench_compute_statevector,
+    'ExpectationGrid.set_circuit': bench_expectation_grid_set_circuit,
+    'optimize': bench_optimize,
+    'CircuitGrid.update': bench_circuit_grid_update,
+}
+
+BENCHMARKS = {
+    'ExpectationGrid.set_adj_matrix': bench_expectation_grid_set_adj_matrix,
+    'ExpectationGrid.calc_expectation_value': bench_calc_expectation_value,
+    'NetworkGraph.set_solution': bench_network_graph_set_solution,
+}
+
+
+def summarize(name, num_qubits, num_layers, timings):
+    timings_ms = [timing * 1000 for timing in timings]
+    return {
+        'name': name,
+        'num_qubits': num_qubits,
+        'num_layers': num_layers,
+        'repeat': len(timings_ms),
+        'min_ms': min(timings_ms),
+        'median_ms': statistics.median(timings_ms),
+        'mean_ms': statistics.mean(timings_ms),
+    }
+
+
+def run_worker(num_qubits, layers, repeat, output_path):
+    """Run every benchmark for one number of qubits, which must match VQE_PLAYGROUND_NUM_QUBITS.
+
+    The results are written to a file, as the code being benchmarked may print.
+    """
+    output = {'results': [], 'skipped': [], 'errors': []}
+    try:
+        import pygame
+        pygame.init()
+        pygame.display.set_mode(WINDOW_SIZE)
+    except ImportError as exc:
+        print('pygame is unavailable:', exc, file=sys.stderr)
+
+    runs = [(name, benchmark, num_layers) for name, benchmark in LAYERED_BENCHMARKS.items() for num_layers in layers]
+    runs += [(name, benchmark, None) for name, benchmark in BENCHMARKS.items()]
+    for name, benchmark, num_layers in runs:
+        rng = np.random.default_rng(0)
+        try:
+            if num_layers is None:
+                timings = benchmark(num_qubits, repeat, rng)
+            else:
+                timings = benchmark(num_qubits, num_layers, repeat, rng)
+        except ImportError as exc:
+            failure = {'name': name, 'num_qubits': num_qubits, 'num_layers': num_layers}
+            if is_missing_optional_package(exc):
+                failure['reason'] = 'missing optional dependency: ' + str(exc)
+                output['skipped'].append(failure)
+            else:
+                failure['reason'] = 'import failed: ' + str(exc)
+                output['errors'].append(failure)
+            continue
+        output['results'].append(summarize(name, num_qubits, num_layers, timings))
+
+    with open(output_path, 'w') as output_file:
+        json.dump(output, output_file)
+
+
+def is_missing_optional_package(exc):
+    """Whether an ImportError is from an optional package that isn't installed, rather than one that is broken"""
+    package = (getattr(exc, 'name', None) or '').split('.')[0]
+    return package in OPTIONAL_PACKAGES and importlib.util.find_spec(package) is None
+
+
+def package_versions():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return {}
+
+    versions = {}
+    for package in VERSIONED_PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def run_benchmarks(qubits, layers, repeat):
+    """Benchmark each number of qubits in a headless worker process, returning the combined results"""
+    env = dict(os.environ)
+    env.setdefault('SDL_VIDEODRIVER', 'dummy')
+    env.setdefault('SDL_AUDIODRIVER', 'dummy')
+    env['PYTHONPATH'] = os.pathsep.join([REPO_DIR] + [path for path in [env.get('PYTHONPATH')] if path])
+
+    output = {
+        'metadata': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'packages': package_versions(),
+            'repeat': repeat,
+            'qubits': qubits,
+            'layers': layers,
+        },
+        'results': [],
+        'skipped': [],
+        'errors': [],
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for num_qubits in qubits:
+            print('Benchmarking', num_qubits, 'qubits', file=sys.stderr)
+            env['VQE_PLAYGROUND_NUM_QUBITS'] = str(num_qubits)
+            worker_output_path = os.path.join(temp_dir, str(num_qubits) + '.json')
+            command = [sys.executable, os.path.abspath(__file__), 'worker', '--num-qubits', str(num_qubits),
+                       '--layers'] + [str(num_layers) for num_layers in layers] + \
+                      ['--repeat', str(repeat), '--output', worker_output_path]
+            # Anything the worker prints goes to standard error, keeping standard output for the results
+            subprocess.run(command, env=env, stdout=sys.stderr, check=True)
+            worker_output = load_results(worker_output_path)
+            output['results'] += worker_output['results']
+            output['skipped'] += worker_output['skipped']
+            output['errors'] += worker_output['errors']
+    return output
+
+
+def result_key(result):
+    return result['name'], result['num_qubits'], result['num_layers']
+
+
+def describe(key):
+    name, num_qubits, num_layers = key
+    description = name + ' qubits=' + str(num_qubits)
+    if num_layers is not None:
+        description += ' layers=' + str(num_layers)
+    return description
+
+
+def compare(baseline, current, threshold, file=sys.stdout):
+    """Print how the median of each benchmark changed, returning the keys of those that regressed or are missing.
+
+    A benchmark in the baseline that is missing from the current results
+    only counts as missing if the current run included its numbers of qubits
+    and layers, and it wasn't skipped for an optional dependency.
+    """
+    baseline_results = {result_key(result): result for result in baseline['results']}
+    skipped_keys = {result_key(skipped) for skipped in current.get('skipped', [])}
+    metadata = current.get('metadata', {})
+    regressions = []
+    for result in current['results']:
+        key = result_key(result)
+        if key not in baseline_results:
+            print('new        ', describe(key), '%.3f ms' % result['median_ms'], file=file)
+            continue
+
+        baseline_ms = baseline_results.pop(key)['median_ms']
+        ratio = result['median_ms'] / baseline_ms if baseline_ms > 0 else float('inf')
+        if ratio > 1 + threshold:
+            status = 'REGRESSION'
+            regressions.append(key)
+        elif ratio < 1 - threshold:
+            status = 'faster'
+        else:
+            status = 'ok'
+        print('%-11s' % status, describe(key), '%.3f ms -> %.3f ms (x%.2f)' % (baseline_ms, result['median_ms'], ratio),
+              file=file)
+
+    for key in baseline_results:
+        name, num_qubits, num_layers = key
+        if num_qubits not in metadata.get('qubits', [num_qubits]) or \
+                num_layers not in metadata.get('layers', [num_layers]) + [None]:
+            continue
+        if key in skipped_keys:
+            print('skipped    ', describe(key), file=file)
+        else:
+            print('MISSING    ', describe(key), file=file)
+            regressions.append(key)
+    return regressions
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the VQE Playground hot paths')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks and write their results as JSON')
+    run_parser.add_argument('-o', '--output', help='results file to write (default: standard output)')
+    run_parser.add_argument('--qubits', type=int, nargs='+', default=DEFAULT_QUBITS)
+    run_parser.add_argument('--layers', type=int, nargs='+', default=DEFAULT_LAYERS)
+    run_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='timed calls of each benchmark')
+    run_parser.add_argument('--baseline', help='results file to compare the new results with')
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='fractional slowdown of the median that counts as a regression')
+
+    compare_parser = subparsers.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='fractional slowdown of the median that counts as a regression')
+
+    worker_parser = subparsers.add_parser('worker')
+    worker_parser.add_argument('--num-qubits', type=int, required=True)
+    worker_parser.add_argument('--layers', type=int, nargs='+', required=True)
+    worker_parser.add_argument('--repeat', type=int, required=True)
+    worker_parser.add_argument('--output', required=True)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        run_worker(args.num_qubits, args.layers, args.repeat, args.output)
+        return
+
+    if args.command == 'compare':
+        baseline, current = load_results(args.baseline), load_results(args.current)
+        comparison_file = sys.stdout
+    else:
+        # Read the baseline first, so that a bad path is reported before the benchmarks run
+        baseline = load_results(args.baseline) if args.baseline else None
+        current = run_benchmarks(args.qubits, args.layers, args.repeat)
+        for skipped in current['skipped']:
+            print('skipped', describe(result_key(skipped)) + ':', skipped['reason'], file=sys.stderr)
+        if args.output:
+            with open(args.output, 'w') as output_file:
+                json.dump(current, output_file, indent=2)
+            comparison_file = sys.stdout
+        else:
+            json.dump(current, sys.stdout, indent=2)
+            print()
+            # Keep standard output for the results
+            comparison_file = sys.stderr
+
+    errors = current.get('errors', [])
+    for error in errors:
+        print('ERROR', describe(result_key(error)) + ':', error['reason'], file=sys.stderr)
+
+    regressions = []
+    if baseline is not None:
+        regressions = compare(baseline, current, args.threshold, comparison_file)
+    if regressions or errors:
+        raise SystemExit(str(len(regressions)) + ' benchmarks regressed by more than ' +
+                         str(round(args.threshold * 100)) + '% or are missing, and ' + str(len(errors)) +
+                         ' failed')
+
+
+if __name__ == '__main__':
+    main()
@@ -31,6 +31,7 @@ setuptools.setup(
     entry_points={
         'console_scripts': [
             'vqe-playground = vqe_playground.command_line:main',
+            'vqe-playground-batch = vqe_playground.batch:main',
         ],
     },
 )
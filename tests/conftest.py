@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+import pytest
+
+from vqe_playground.model import circuit_node_types as node_types
+from vqe_playground.model.circuit_grid_model import CircuitGridModel, CircuitGridNode
+
+SINGLE_QUBIT_TYPES = [node_types.IDEN, node_types.S, node_types.SDG, node_types.T, node_types.TDG]
+
+
+def build_random_model(rng, num_wires=4, num_columns=12):
+    """A circuit grid with one random gate in each column, of every kind the grid can hold"""
+    model = CircuitGridModel(num_wires, num_columns)
+    for column_num in range(num_columns):
+        wire_num, other_wire_num, control_wire_num = rng.permutation(num_wires)[:3].tolist()
+        kind = rng.integers(7)
+        if kind == 0:
+            # Rotation, or Pauli gate at an angle of zero
+            node = CircuitGridNode(rng.choice([node_types.X, node_types.Y, node_types.Z]),
+                                   rng.choice([0.0, rng.uniform(0, 2 * np.pi)]))
+        elif kind == 1:
+            node = CircuitGridNode(rng.choice([node_types.X, node_types.Y, node_types.Z]), ctrl_a=control_wire_num)
+        elif kind == 2:
+            node = CircuitGridNode(node_types.X, ctrl_a=control_wire_num, ctrl_b=other_wire_num)
+        elif kind == 3:
+            node = CircuitGridNode(node_types.Z, rng.uniform(0, 2 * np.pi), ctrl_a=control_wire_num)
+        elif kind == 4:
+            node = CircuitGridNode(node_types.H, ctrl_a=rng.choice([-1, control_wire_num]))
+        elif kind == 5:
+            node = CircuitGridNode(node_types.SWAP, ctrl_a=rng.choice([-1, control_wire_num]), swap=other_wire_num)
+        else:
+            node = CircuitGridNode(rng.choice(SINGLE_QUBIT_TYPES))
+        model.set_node(wire_num, column_num, node)
+    return model
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1234)
+
+
+@pytest.fixture
+def random_model(rng):
+    """Builds random circuit grids from the rng fixture"""
+    return lambda num_wires=4, num_columns=12: build_random_model(rng, num_wires, num_columns)
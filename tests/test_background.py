@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+
+import numpy as np
+import pytest
+
+from vqe_playground.model.ansatz import create_ansatz_model
+from vqe_playground.optimization import BackgroundOptimizer, CoordinateSearch, Optimizer, SPSA
+from vqe_playground.sim.maxcut import maxcut_diagonal
+
+WEIGHT_MATRIX = np.array([[0, 1, 1], [1, 0, 1], [1, 1, 0]], dtype=np.float64)
+
+
+class FailingOptimizer(Optimizer):
+    def _iterate(self):
+        yield from self._evaluate(self.rotations)
+        raise RuntimeError('optimizer failed')
+
+
+@pytest.fixture
+def problem():
+    eigenvalues, _ = maxcut_diagonal(WEIGHT_MATRIX)
+    return create_ansatz_model(3).get_gate_tape(), eigenvalues
+
+
+def wait_for_snapshots(background_optimizer, timeout=10):
+    """Collect snapshots until one is done"""
+    snapshots = []
+    deadline = time.perf_counter() + timeout
+    while not snapshots or not snapshots[-1].done:
+        assert time.perf_counter() < deadline
+        snapshot = background_optimizer.latest_snapshot()
+        if snapshot is not None:
+            snapshots.append(snapshot)
+        time.sleep(0.001)
+    return snapshots
+
+
+def test_publishes_snapshots_and_a_final_one(problem):
+    gate_tape, eigenvalues = problem
+    optimizer = CoordinateSearch(np.full(gate_tape.num_params, np.pi))
+    background_optimizer = BackgroundOptimizer(optimizer, gate_tape, eigenvalues, snapshot_interval=0)
+    background_optimizer.start()
+    snapshots = wait_for_snapshots(background_optimizer)
+    background_optimizer.stop()
+
+    assert all(not snapshot.done for snapshot in snapshots[:-1])
+    final = snapshots[-1]
+    assert final.cost == pytest.approx(eigenvalues.min())
+    assert final.cur_rotation_num is None
+    np.testing.assert_array_equal(final.rotations, optimizer.reported_rotations())
+    # The worker simulated its own copy of the tape
+    assert np.all(gate_tape.params == np.pi)
+
+
+def test_stop_joins_the_worker(problem):
+    gate_tape, eigenvalues = problem
+    optimizer = SPSA(np.full(gate_tape.num_params, 1.0), max_iterations=None, seed=0)
+    background_optimizer = BackgroundOptimizer(optimizer, gate_tape, eigenvalues)
+    background_optimizer.start()
+    time.sleep(0.05)
+    background_optimizer.stop()
+    assert not background_optimizer._thread.is_alive()
+    assert optimizer.done()
+
+
+def test_worker_errors_are_raised_by_latest_snapshot(problem):
+    gate_tape, eigenvalues = problem
+    background_optimizer = BackgroundOptimizer(FailingOptimizer(np.zeros(gate_tape.num_params)), gate_tape,
+                                               eigenvalues)
+    background_optimizer.start()
+    background_optimizer._thread.join()
+    with pytest.raises(RuntimeError, match='optimizer failed'):
+        background_optimizer.latest_snapshot()
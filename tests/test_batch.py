@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import io
+import itertools
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from vqe_playground import batch
+
+TRIANGLE = [[0, 1, 1], [1, 0, 1], [1, 1, 0]]
+SQUARE = [[0, 2, 0, 1], [2, 0, 1, 0], [0, 1, 0, 3], [1, 0, 3, 0]]
+HEXAGON = (np.roll(np.eye(6), 1, axis=1) + np.roll(np.eye(6), -1, axis=1) + np.eye(6)[::-1]) * (1 - np.eye(6))
+
+
+def brute_force_max_cut(adj_matrix):
+    adj_matrix = np.asarray(adj_matrix)
+    num_nodes = len(adj_matrix)
+    return max(sum(adj_matrix[i, j] for i in range(num_nodes) for j in range(i) if sides[i] != sides[j])
+               for sides in itertools.product((0, 1), repeat=num_nodes))
+
+
+def cut_weight(adj_matrix, partition):
+    adj_matrix = np.asarray(adj_matrix)
+    return sum(adj_matrix[i, j] for i in range(len(partition)) for j in range(i) if partition[i] != partition[j])
+
+
+def read_results(path):
+    with open(path) as results_file:
+        return [json.loads(line) for line in results_file]
+
+
+def test_read_graphs_from_jsonl_and_npy(tmp_path):
+    jsonl_path = tmp_path / 'graphs.jsonl'
+    jsonl_path.write_text(json.dumps(TRIANGLE) + '\n\n' + json.dumps({'id': 'square', 'adj_matrix': SQUARE}) + '\n')
+    stack_path = tmp_path / 'stack.npy'
+    np.save(stack_path, np.array([TRIANGLE, TRIANGLE]))
+    single_path = tmp_path / 'single.npy'
+    np.save(single_path, np.array(SQUARE))
+
+    graphs = list(batch.read_graphs([str(jsonl_path), str(stack_path), str(single_path)]))
+    assert [graph_id for graph_id, _ in graphs] == [str(jsonl_path) + ':0', 'square', str(stack_path) + ':0',
+                                                   str(stack_path) + ':1', str(single_path) + ':0']
+    for (_, adj_matrix), expected in zip(graphs, [TRIANGLE, SQUARE, TRIANGLE, TRIANGLE, SQUARE]):
+        np.testing.assert_array_equal(adj_matrix, expected)
+
+
+def test_read_graphs_from_stdin(monkeypatch):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(json.dumps({'adj_matrix': TRIANGLE}) + '\n'))
+    (graph_id, adj_matrix), = batch.read_graphs(['-'])
+    assert graph_id == '-:0'
+    np.testing.assert_array_equal(adj_matrix, TRIANGLE)
+
+
+@pytest.mark.parametrize('adj_matrix', [TRIANGLE, SQUARE, HEXAGON.tolist()])
+def test_solve_graph_finds_the_maximum_cut(adj_matrix):
+    result = batch.solve_graph('graph', np.array(adj_matrix, dtype=np.float64), num_starts=2, seed=0)
+    json.dumps(result)
+    assert result['id'] == 'graph'
+    assert result['num_nodes'] == len(adj_matrix)
+    assert len(result['partition']) == len(adj_matrix)
+    assert result['partition'] == [int(bit) for bit in reversed(result['basis_state'])]
+    assert result['cut_weight'] == pytest.approx(cut_weight(adj_matrix, result['partition']))
+    assert result['cut_weight'] == pytest.approx(result['max_cut_weight'])
+    assert result['max_cut_weight'] == pytest.approx(brute_force_max_cut(adj_matrix))
+
+
+def test_results_are_written_in_input_order_with_several_workers(tmp_path):
+    graphs = [TRIANGLE, SQUARE, HEXAGON.tolist()] * 3
+    input_path = tmp_path / 'graphs.jsonl'
+    input_path.write_text(''.join(json.dumps({'id': str(idx), 'adj_matrix': adj_matrix}) + '\n'
+                                  for idx, adj_matrix in enumerate(graphs)))
+    output_path = tmp_path / 'results.jsonl'
+    batch.main([str(input_path), '-o', str(output_path), '--workers', '3', '--seed', '0'])
+
+    results = read_results(output_path)
+    assert [result['id'] for result in results] == [str(idx) for idx in range(len(graphs))]
+    for result, adj_matrix in zip(results, graphs):
+        assert result['cut_weight'] == pytest.approx(brute_force_max_cut(adj_matrix))
+
+
+def test_batch_does_not_import_display_packages():
+    code = ('import sys, vqe_playground.batch; '
+            'print(sorted({"pygame", "matplotlib", "networkx", "qiskit"} & set(sys.modules)))')
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+import pytest
+
+from vqe_playground.model import circuit_node_types as node_types
+from vqe_playground.model.circuit_grid_model import CircuitGridModel, CircuitGridNode
+
+
+def search_gate_part(model, wire_num, column_num):
+    """The gate part of a node, found by searching its column as the model used to"""
+    node = model.get_node(wire_num, column_num)
+    if node.node_type != node_types.EMPTY:
+        return node.node_type
+    for other_wire_num in range(model.max_wires):
+        if other_wire_num != wire_num:
+            other_node = model.get_node(other_wire_num, column_num)
+            if other_node.ctrl_a == wire_num or other_node.ctrl_b == wire_num:
+                return node_types.CTRL
+            elif other_node.swap == wire_num:
+                return node_types.SWAP
+    return node_types.EMPTY
+
+
+def search_gate_wire_for_control_node(model, control_wire_num, column_num):
+    """The wire of the gate a control belongs to, found by searching its column as the model used to"""
+    gate_wire_num = -1
+    for wire_num in range(model.max_wires):
+        if wire_num != control_wire_num:
+            node = model.get_node(wire_num, column_num)
+            if node.ctrl_a == control_wire_num or node.ctrl_b == control_wire_num:
+                gate_wire_num = wire_num
+    return gate_wire_num
+
+
+def test_shared_control_survives_replacing_one_gate():
+    model = CircuitGridModel(5, 3)
+    model.set_node(0, 1, CircuitGridNode(node_types.X, ctrl_a=2))
+    model.set_node(4, 1, CircuitGridNode(node_types.Z, ctrl_a=2))
+    assert model.get_node_gate_part(2, 1) == node_types.CTRL
+    assert model.get_gate_wire_for_control_node(2, 1) == 4
+
+    model.set_node(4, 1, CircuitGridNode(node_types.EMPTY))
+    assert model.get_node_gate_part(2, 1) == node_types.CTRL
+    assert model.get_gate_wire_for_control_node(2, 1) == 0
+
+    model.set_node(0, 1, CircuitGridNode(node_types.EMPTY))
+    assert model.get_node_gate_part(2, 1) == node_types.EMPTY
+    assert model.get_gate_wire_for_control_node(2, 1) == -1
+
+
+def test_control_removed_through_a_view():
+    model = CircuitGridModel(4, 2)
+    model.set_node(0, 0, CircuitGridNode(node_types.X, ctrl_a=3))
+    node = model.get_node(0, 0)
+    node.ctrl_a = -1
+    model.set_node(0, 0, node)
+    assert model.get_node_gate_part(3, 0) == node_types.EMPTY
+    assert model.get_gate_wire_for_control_node(3, 0) == -1
+
+
+def test_gate_part_index_matches_column_search():
+    rng = np.random.default_rng(7)
+    model = CircuitGridModel(6, 4)
+    gate_types = [node_types.EMPTY, node_types.X, node_types.Y, node_types.Z, node_types.H, node_types.SWAP]
+    for _ in range(500):
+        wire_num, column_num = rng.integers(6), rng.integers(4)
+        node = CircuitGridNode(rng.choice(gate_types), ctrl_a=rng.integers(-1, 6), ctrl_b=rng.integers(-1, 6),
+                               swap=rng.integers(-1, 6))
+        model.set_node(wire_num, column_num, node)
+        for other_wire_num in range(6):
+            assert model.get_node_gate_part(other_wire_num, column_num) == \
+                search_gate_part(model, other_wire_num, column_num)
+            assert model.get_gate_wire_for_control_node(other_wire_num, column_num) == \
+                search_gate_wire_for_control_node(model, other_wire_num, column_num)
+
+
+def test_unchanged_radians_do_not_bump_the_version():
+    model = CircuitGridModel(2, 2)
+    model.set_node(0, 0, CircuitGridNode(node_types.Y, 1.0))
+    version = model.get_version()
+    model.set_node_radians(0, 0, 1.0)
+    assert model.get_version() == version
+
+    model.set_node_radians(0, 0, 2.0)
+    assert model.get_version() == (version[0], version[1] + 1)
+
+
+def test_set_rotation_angles_bumps_only_the_param_version():
+    model = CircuitGridModel(2, 2)
+    model.set_node(0, 0, CircuitGridNode(node_types.Y, 1.0))
+    model.set_node(1, 1, CircuitGridNode(node_types.X, 2.0))
+    structure_version, param_version = model.get_version()
+
+    model.set_rotation_angles([1.0, 2.0])
+    assert model.get_version() == (structure_version, param_version)
+    model.set_rotation_angles([3.0, 2.0])
+    assert model.get_version() == (structure_version, param_version + 1)
+    np.testing.assert_array_equal(model.get_rotation_angles(), [3.0, 2.0])
+
+
+def test_rotation_gate_nodes_are_cached_until_the_structure_changes():
+    model = CircuitGridModel(2, 2)
+    model.set_node(0, 0, CircuitGridNode(node_types.Y, 1.0))
+    rotation_gate_nodes = model.get_rotation_gate_nodes()
+    model.set_rotation_angles([2.0])
+    assert all(node is cached for node, cached in zip(model.get_rotation_gate_nodes(), rotation_gate_nodes))
+
+    model.set_node(1, 1, CircuitGridNode(node_types.Z, 0.5))
+    assert [(node.wire_num, node.column_num) for node in model.get_rotation_gate_nodes()] == [(0, 0), (1, 1)]
+
+
+def test_compute_circuit_is_cached_until_either_version_changes():
+    pytest.importorskip('qiskit')
+    model = CircuitGridModel(2, 2)
+    model.set_node(0, 0, CircuitGridNode(node_types.Y, 1.0))
+    circuit = model.compute_circuit()
+    assert model.compute_circuit() is circuit
+    model.set_node_radians(0, 0, 1.0)
+    assert model.compute_circuit() is circuit
+
+    model.set_node_radians(0, 0, 2.0)
+    param_circuit = model.compute_circuit()
+    assert param_circuit is not circuit
+    model.set_node(1, 1, CircuitGridNode(node_types.H))
+    assert model.compute_circuit() is not param_circuit
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from vqe_playground.sim.maxcut import maxcut_diagonal, update_maxcut_diagonal
+
+
+def reference_maxcut_diagonal(weight_matrix):
+    """The sum of 0.5 * w_ij * Z_i Z_j over edges i > j, evaluated one basis state at a time"""
+    num_nodes = len(weight_matrix)
+    diagonal = np.zeros(2 ** num_nodes)
+    shift = 0.0
+    for i in range(num_nodes):
+        for j in range(i):
+            shift -= 0.5 * weight_matrix[i, j]
+            for index in range(2 ** num_nodes):
+                z_i = 1 - 2 * (index >> i & 1)
+                z_j = 1 - 2 * (index >> j & 1)
+                diagonal[index] += 0.5 * weight_matrix[i, j] * z_i * z_j
+    return diagonal, shift
+
+
+def random_weight_matrix(rng, num_nodes):
+    weight_matrix = np.tril(rng.integers(0, 4, (num_nodes, num_nodes)), -1).astype(np.float64)
+    return weight_matrix + weight_matrix.T
+
+
+def test_maxcut_diagonal_matches_reference(rng):
+    for num_nodes in range(1, 7):
+        weight_matrix = random_weight_matrix(rng, num_nodes)
+        diagonal, shift = maxcut_diagonal(weight_matrix)
+        expected_diagonal, expected_shift = reference_maxcut_diagonal(weight_matrix)
+        np.testing.assert_allclose(diagonal, expected_diagonal)
+        assert np.isclose(shift, expected_shift)
+
+
+def test_update_maxcut_diagonal_matches_rebuild(rng):
+    num_nodes = 5
+    weight_matrix = random_weight_matrix(rng, num_nodes)
+    diagonal, shift = maxcut_diagonal(weight_matrix)
+    for _ in range(30):
+        i, j = rng.choice(num_nodes, 2, replace=False)
+        new_weight = rng.integers(0, 4)
+        shift = update_maxcut_diagonal(diagonal, shift, i, j, new_weight - weight_matrix[i, j])
+        weight_matrix[i, j] = weight_matrix[j, i] = new_weight
+
+        expected_diagonal, expected_shift = maxcut_diagonal(weight_matrix)
+        np.testing.assert_allclose(diagonal, expected_diagonal)
+        assert np.isclose(shift, expected_shift)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from vqe_playground.model.ansatz import create_ansatz_model
+from vqe_playground.optimization import MultiStartOptimizer
+from vqe_playground.sim.maxcut import maxcut_diagonal
+
+
+def test_multistart_streams_improvements_and_finds_the_minimum():
+    weight_matrix = np.array([[0, 1, 1, 0], [1, 0, 1, 1], [1, 1, 0, 1], [0, 1, 1, 0]], dtype=np.float64)
+    eigenvalues, _ = maxcut_diagonal(weight_matrix)
+    model = create_ansatz_model(4)
+    optimizer = MultiStartOptimizer(model.get_gate_tape(), eigenvalues, num_starts=4, seed=5, max_workers=2,
+                                    progress_interval=0)
+    # The pool is given its own copy of the tape, so changing the model's doesn't affect it
+    model.set_rotation_angles(np.zeros(len(model.get_rotation_angles())))
+    optimizer.start()
+    try:
+        costs = []
+        while not optimizer.done():
+            result = optimizer.poll()
+            if result is not None:
+                costs.append(result.cost)
+    finally:
+        optimizer.shutdown()
+    assert costs == sorted(costs, reverse=True)
+    assert np.isclose(costs[-1], eigenvalues.min())
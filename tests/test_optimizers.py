@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+import pytest
+
+from vqe_playground.model.ansatz import create_ansatz_model
+from vqe_playground.optimization import OPTIMIZERS, CoordinateSearch, Adam, Cobyla, initial_rotations_for_start
+from vqe_playground.sim.maxcut import maxcut_diagonal
+from vqe_playground.sim.statevector import expectation_values
+
+# A weighted 4 node graph, whose maximum cut separates nodes 0 and 3 from 1 and 2
+WEIGHT_MATRIX = np.array([[0, 1, 2, 0], [1, 0, 1, 3], [2, 1, 0, 1], [0, 3, 1, 0]], dtype=np.float64)
+
+
+class BaselineOptimizer():
+    """The playground's original optimize_rotations, called once per frame until it finishes"""
+    def __init__(self, rotations, num_epochs=1):
+        self.optimized_rotations = np.array(rotations, dtype=np.float64)
+        self.num_epochs = num_epochs
+        self.cur_optimization_epoch = 0
+        self.cur_rotation_num = 0
+        self.rotation_initialized = False
+        self.finished_rotating = False
+
+    def done(self):
+        return self.cur_optimization_epoch >= self.num_epochs
+
+    def optimize_rotations(self, objective_function):
+        move_radians = np.pi / 8
+        self.min_distance = objective_function(self.optimized_rotations)
+        if self.cur_optimization_epoch < self.num_epochs:
+            if self.cur_rotation_num < len(self.optimized_rotations):
+                if not self.rotation_initialized:
+                    self.cur_ang_rad = self.optimized_rotations[self.cur_rotation_num]
+                    self.proposed_cur_ang_rad = self.cur_ang_rad
+                    self.unit_direction_array = np.ones(len(self.optimized_rotations))
+                    self.rotation_initialized = True
+
+                    self.unit_direction_array[self.cur_rotation_num] = 1
+                    if self.cur_ang_rad > np.pi:
+                        self.unit_direction_array[self.cur_rotation_num] = -1
+                    self.proposed_cur_ang_rad += move_radians * self.unit_direction_array[self.cur_rotation_num]
+                    if 0.0 <= self.proposed_cur_ang_rad < np.pi * 2 + 0.01:
+                        self.optimized_rotations[self.cur_rotation_num] = self.proposed_cur_ang_rad
+                        temp_distance = objective_function(self.optimized_rotations)
+                        if temp_distance > self.min_distance:
+                            self.optimized_rotations[self.cur_rotation_num] = self.cur_ang_rad
+                            self.unit_direction_array[self.cur_rotation_num] *= -1
+                        else:
+                            self.cur_ang_rad = self.proposed_cur_ang_rad
+                            self.min_distance = temp_distance
+                        self.finished_rotating = False
+                        self.rotation_iterations = 0
+
+                elif self.rotation_initialized and not self.finished_rotating:
+                    self.rotation_iterations += 1
+                    self.proposed_cur_ang_rad += move_radians * self.unit_direction_array[self.cur_rotation_num]
+                    if 0.0 <= self.proposed_cur_ang_rad <= np.pi * 2 + 0.01:
+                        self.optimized_rotations[self.cur_rotation_num] = self.proposed_cur_ang_rad
+                        temp_distance = objective_function(self.optimized_rotations)
+                        if temp_distance >= self.min_distance:
+                            self.optimized_rotations[self.cur_rotation_num] = self.cur_ang_rad
+                            self.finished_rotating = True
+                            self.cur_rotation_num += 1
+                            self.rotation_initialized = False
+                        elif self.rotation_iterations > np.pi * 2 / move_radians:
+                            self.finished_rotating = True
+                            self.cur_rotation_num += 1
+                            self.rotation_initialized = False
+                        else:
+                            self.cur_ang_rad = self.proposed_cur_ang_rad
+                            self.min_distance = temp_distance
+                    else:
+                        self.finished_rotating = True
+                        self.cur_rotation_num += 1
+                        self.rotation_initialized = False
+            else:
+                self.cur_rotation_num = 0
+                self.cur_optimization_epoch += 1
+            objective_function(self.optimized_rotations)
+
+
+def without_repeats(trajectory):
+    """The trajectory without consecutive evaluations of the same angles"""
+    return [rotations for idx, rotations in enumerate(trajectory)
+            if idx == 0 or not np.array_equal(rotations, trajectory[idx - 1])]
+
+
+@pytest.fixture
+def problem():
+    eigenvalues, _ = maxcut_diagonal(WEIGHT_MATRIX)
+    return create_ansatz_model(4, num_layers=3).get_gate_tape(), eigenvalues
+
+
+@pytest.mark.parametrize('name', sorted(OPTIMIZERS))
+def test_optimizer_finds_the_maximum_cut(problem, name):
+    if name in ('cobyla', 'lbfgs'):
+        pytest.importorskip('scipy')
+    gate_tape, eigenvalues = problem
+    optimizer_class = OPTIMIZERS[name]
+    initial_rotations = initial_rotations_for_start(gate_tape.num_params, 0, 0,
+                                                    random_first=optimizer_class.uses_gradient)
+    optimizer = optimizer_class(initial_rotations, seed=0) if name == 'spsa' else optimizer_class(initial_rotations)
+
+    result = optimizer.minimize(gate_tape, eigenvalues)
+    assert result.cost == pytest.approx(eigenvalues.min(), abs=1e-2)
+    assert eigenvalues[result.basis_state_idx] == eigenvalues.min()
+    assert result.num_evaluations == optimizer.num_evaluations > 0
+
+
+@pytest.mark.parametrize('num_epochs', [1, 2])
+def test_coordinate_search_follows_the_baseline_trajectory(problem, num_epochs):
+    gate_tape, eigenvalues = problem
+    initial_rotations = np.full(gate_tape.num_params, np.pi)
+
+    def cost(rotations):
+        return expectation_values(gate_tape.run(rotations), eigenvalues)[0]
+
+    baseline_trajectory = []
+
+    def objective_function(rotations):
+        baseline_trajectory.append(rotations.copy())
+        return cost(rotations)
+
+    baseline = BaselineOptimizer(initial_rotations, num_epochs)
+    while not baseline.done():
+        baseline.optimize_rotations(objective_function)
+
+    trajectory = []
+    optimizer = CoordinateSearch(initial_rotations, num_epochs)
+    while not optimizer.done():
+        candidates = optimizer.ask()
+        trajectory.extend(candidates.copy())
+        optimizer.tell([cost(rotations) for rotations in candidates])
+
+    np.testing.assert_array_equal(optimizer.rotations, baseline.optimized_rotations)
+    np.testing.assert_array_equal(without_repeats(trajectory), without_repeats(baseline_trajectory))
+
+
+def test_ask_returns_the_same_candidates_until_told(problem):
+    gate_tape, eigenvalues = problem
+    optimizer = CoordinateSearch(np.full(gate_tape.num_params, np.pi))
+    candidates = optimizer.ask()
+    assert candidates.shape == (1, gate_tape.num_params)
+    assert optimizer.ask() is candidates
+
+    optimizer.tell([0.0])
+    assert optimizer.num_evaluations == 1
+    assert optimizer.ask() is not candidates
+
+
+@pytest.mark.parametrize('optimizer_class', [CoordinateSearch, Adam, Cobyla])
+def test_close_stops_the_optimizer(problem, optimizer_class):
+    if optimizer_class is Cobyla:
+        pytest.importorskip('scipy')
+    gate_tape, eigenvalues = problem
+    optimizer = optimizer_class(np.full(gate_tape.num_params, 1.0))
+    optimizer.step(gate_tape, eigenvalues)
+    optimizer.close()
+    assert optimizer.ask() is None
+    assert optimizer.done()
+
+    # Closing an optimizer that never started also stops it
+    optimizer = optimizer_class(np.full(gate_tape.num_params, 1.0))
+    optimizer.close()
+    assert optimizer.done()
+
+
+def test_reported_rotations_turn_zero_into_a_full_turn():
+    rotations = np.array([0.0, 1.0, np.pi])
+    np.testing.assert_array_equal(CoordinateSearch(rotations).reported_rotations(), rotations)
+    np.testing.assert_array_equal(Adam(rotations).reported_rotations(), [2 * np.pi, 1.0, np.pi])
+    # A copy, so applying it can't change the optimizer's own angles
+    optimizer = Adam(rotations)
+    optimizer.reported_rotations()[1] = 5.0
+    assert optimizer.rotations[1] == 1.0
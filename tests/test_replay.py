@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+
+import pygame
+import pytest
+
+from vqe_playground.replay import EventRecorder, EventReplay, QUIT_DELAY_MS, RECORDING_VERSION
+
+
+def record(path, events, num_qubits=4):
+    recorder = EventRecorder(str(path), num_qubits)
+    recorder.start()
+    recorder.record(events)
+    recorder.close()
+
+
+def replay_all(replay):
+    """Every event in a replay, as if its whole duration had passed"""
+    replay.start()
+    replay.start_time -= (replay.events[-1][0] + 1) / 1000
+    return replay.due_events()
+
+
+def test_round_trip_appends_quit(tmp_path):
+    path = tmp_path / 'session.jsonl'
+    record(path, [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_o, mod=0, unicode='o'),
+                  pygame.event.Event(pygame.MOUSEMOTION, pos=(1, 2), rel=(0, 0), buttons=(0, 0, 0)),
+                  pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(10, 20), button=1),
+                  pygame.event.Event(pygame.JOYAXISMOTION, joy=0, axis=1, value=-0.5)])
+
+    replay = EventReplay(str(path), 4)
+    events = replay_all(replay)
+    assert [event.type for event in events] == [pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.JOYAXISMOTION,
+                                               pygame.QUIT]
+    assert (events[0].key, events[0].mod) == (pygame.K_o, 0)
+    assert not hasattr(events[0], 'unicode')
+    assert tuple(events[1].pos) == (10, 20) and events[1].button == 1
+    assert (events[2].axis, events[2].value) == (1, -0.5)
+    assert replay.events[-1][0] == replay.events[-2][0] + QUIT_DELAY_MS
+
+    replay.frame_presented()
+    assert sorted(stage_stats.stage for stage_stats in replay.latencies.stats()) == \
+        sorted(pygame.event.event_name(event.type) for event in events)
+    assert replay.due_events() == []
+
+
+def test_recorded_quit_is_not_repeated(tmp_path):
+    path = tmp_path / 'session.jsonl'
+    record(path, [pygame.event.Event(pygame.QUIT)])
+    events = replay_all(EventReplay(str(path), 4))
+    assert [event.type for event in events] == [pygame.QUIT]
+
+
+def test_empty_recording_quits(tmp_path):
+    path = tmp_path / 'session.jsonl'
+    record(path, [])
+    events = replay_all(EventReplay(str(path), 4))
+    assert [event.type for event in events] == [pygame.QUIT]
+
+
+def test_qubit_count_must_match(tmp_path):
+    path = tmp_path / 'session.jsonl'
+    record(path, [], num_qubits=4)
+    with pytest.raises(SystemExit, match='recorded with 4 qubits, but 5 are configured'):
+        EventReplay(str(path), 5)
+
+
+def test_recording_version_must_match(tmp_path):
+    path = tmp_path / 'session.jsonl'
+    path.write_text(json.dumps({'version': RECORDING_VERSION + 1, 'num_qubits': 4}) + '\n')
+    with pytest.raises(SystemExit, match='not a recording that this version can replay'):
+        EventReplay(str(path), 4)
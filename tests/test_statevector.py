@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+import pytest
+
+from vqe_playground.sim.gates import H_MATRIX, X_MATRIX, rx_matrix, ry_matrix
+from vqe_playground.sim.statevector import apply_gate, apply_swap, zero_state
+
+NUM_QUBITS = 4
+
+
+def dense_gate(num_qubits, matrix, target, controls=()):
+    """The full matrix of a gate, built one basis state at a time. Qubit q is bit q of the index."""
+    dim = 2 ** num_qubits
+    full = np.zeros((dim, dim), dtype=complex)
+    for col in range(dim):
+        if all(col >> control & 1 for control in controls):
+            in_bit = col >> target & 1
+            for out_bit in range(2):
+                row = col & ~(1 << target) | out_bit << target
+                full[row, col] += matrix[out_bit, in_bit]
+        else:
+            full[col, col] = 1
+    return full
+
+
+def dense_swap(num_qubits, qubit_a, qubit_b, controls=()):
+    dim = 2 ** num_qubits
+    full = np.zeros((dim, dim), dtype=complex)
+    for col in range(dim):
+        row = col
+        if all(col >> control & 1 for control in controls) and (col >> qubit_a & 1) != (col >> qubit_b & 1):
+            row = col ^ (1 << qubit_a) ^ (1 << qubit_b)
+        full[row, col] = 1
+    return full
+
+
+def random_state(rng, num_qubits, batch_size=None):
+    shape = (2 ** num_qubits,) if batch_size is None else (batch_size, 2 ** num_qubits)
+    state = rng.normal(size=shape) + 1j * rng.normal(size=shape)
+    return state / np.linalg.norm(state, axis=-1, keepdims=True)
+
+
+@pytest.mark.parametrize('controls', [(), (0,), (3, 1)])
+@pytest.mark.parametrize('target', [0, 2])
+def test_apply_gate_matches_dense_matrix(rng, target, controls):
+    for matrix in (H_MATRIX, X_MATRIX, ry_matrix(0.7)):
+        if target in controls:
+            continue
+        state = random_state(rng, NUM_QUBITS)
+        expected = dense_gate(NUM_QUBITS, matrix, target, controls) @ state
+        np.testing.assert_allclose(apply_gate(state.copy(), NUM_QUBITS, matrix, target, controls), expected)
+
+
+def test_apply_gate_to_batch_with_a_matrix_per_state(rng):
+    states = random_state(rng, NUM_QUBITS, 3)
+    angles = np.array([0.1, 1.2, 2.3])
+    result = apply_gate(states.copy(), NUM_QUBITS, rx_matrix(angles), 1)
+    for idx, angle in enumerate(angles):
+        np.testing.assert_allclose(result[idx], dense_gate(NUM_QUBITS, rx_matrix(angle), 1) @ states[idx])
+
+
+@pytest.mark.parametrize('controls', [(), (2,)])
+def test_apply_swap_matches_dense_matrix(rng, controls):
+    state = random_state(rng, NUM_QUBITS)
+    expected = dense_swap(NUM_QUBITS, 0, 3, controls) @ state
+    np.testing.assert_allclose(apply_swap(state.copy(), NUM_QUBITS, 0, 3, controls), expected)
+
+
+def test_zero_state():
+    state = zero_state(3)
+    assert state[0] == 1 and np.count_nonzero(state) == 1
+
+
+def test_circuit_grid_statevector_matches_qiskit(random_model):
+    quantum_info = pytest.importorskip('qiskit.quantum_info')
+    for _ in range(20):
+        model = random_model()
+        expected = quantum_info.Statevector(model.compute_circuit()).data
+        np.testing.assert_allclose(model.compute_statevector(), expected, atol=1e-12)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from vqe_playground.model.ansatz import create_ansatz_model
+from vqe_playground.model.circuit_grid_model import CircuitGridModel
+from vqe_playground.sim.statevector import zero_state
+
+
+def test_empty_tape_runs_to_zero_state():
+    model = CircuitGridModel(3, 0)
+    np.testing.assert_array_equal(model.compute_statevector(), zero_state(3))
+    np.testing.assert_array_equal(model.compute_statevector(), zero_state(3))
+
+
+def test_run_recomputes_after_set_param(rng, monkeypatch):
+    # A small budget checkpoints every few columns rather than every column
+    monkeypatch.setattr('vqe_playground.sim.tape.CHECKPOINT_MEMORY_BUDGET', 4 * 16 * 16)
+    tape = create_ansatz_model(4).get_gate_tape()
+    assert tape.checkpoint_stride > 1
+
+    params = tape.params.copy()
+    np.testing.assert_allclose(tape.run(), tape.run(params))
+    for slot in rng.integers(tape.num_params, size=20):
+        params[slot] = rng.choice([0.0, rng.uniform(0, 2 * np.pi)])
+        tape.set_param(slot, params[slot])
+        np.testing.assert_allclose(tape.run(), tape.run(params))
+
+
+def test_run_batch_matches_run(rng, random_model):
+    for tape in (create_ansatz_model(4).get_gate_tape(), random_model().get_gate_tape()):
+        param_sets = rng.uniform(0, 2 * np.pi, (5, tape.num_params))
+        if tape.num_params:
+            param_sets[0, 0] = 0.0
+        states = tape.run_batch(param_sets)
+        for params, state in zip(param_sets, states):
+            np.testing.assert_allclose(state, tape.run(params))
+
+
+def test_gradient_matches_finite_differences(rng):
+    tape = create_ansatz_model(4, num_layers=3).get_gate_tape()
+    eigenvalues = rng.normal(size=2 ** 4)
+    params = rng.uniform(0, 2 * np.pi, tape.num_params)
+
+    step = 1e-5
+    shifts = np.eye(tape.num_params) * step
+    exp_vals, _ = tape.evaluate_batch(np.concatenate((params + shifts, params - shifts)), eigenvalues,
+                                      zero_is_pauli=False)
+    finite_differences = (exp_vals[:tape.num_params] - exp_vals[tape.num_params:]) / (2 * step)
+    np.testing.assert_allclose(tape.gradient(eigenvalues, params), finite_differences, atol=1e-7)
+
+
+
+def test_run_recomputes_after_set_params(rng, monkeypatch):
+    monkeypatch.setattr('vqe_playground.sim.tape.CHECKPOINT_MEMORY_BUDGET', 4 * 16 * 16)
+    tape = create_ansatz_model(4).get_gate_tape()
+    tape.run()
+
+    params = tape.params.copy()
+    for num_changed in (1, 3, tape.num_params):
+        params[-num_changed:] = rng.uniform(0, 2 * np.pi, num_changed)
+        tape.set_params(params)
+        np.testing.assert_allclose(tape.run(), tape.run(params))
+
+
+def test_model_statevector_follows_rotation_angles(rng):
+    model = create_ansatz_model(3)
+    model.compute_statevector()
+    angles = rng.uniform(0, 2 * np.pi, len(model.get_rotation_angles()))
+    model.set_rotation_angles(angles)
+    np.testing.assert_allclose(model.compute_statevector(), create_ansatz_model(3).get_gate_tape().run(angles))
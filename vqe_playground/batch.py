@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Solve MaxCut for many graphs without a display.
+
+Reads adjacency matrices from JSONL files (one matrix per line, either as a
+nested list or as an object with an "adj_matrix" key and an optional "id")
+or from .npy files holding one matrix or a stack of them. Each graph is
+solved with the playground's ansatz and a choice of optimizer, and one JSON
+result per graph is written, in input order, as soon as it is ready.
+
+This module must not import pygame, matplotlib or networkx.
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .model.ansatz import create_ansatz_model, NUM_ANSATZ_LAYERS
+from .optimization import OPTIMIZERS, initial_rotations_for_start
+from .sim.maxcut import maxcut_diagonal
+
+# Compiled ansatz tapes, reused by a worker for every graph with the same number of nodes
+_ansatz_tapes = {}
+
+
+def read_graphs(paths):
+    """Yield (graph id, adjacency matrix) for every graph in the given files"""
+    for path in paths:
+        if path.endswith('.npy'):
+            matrices = np.load(path)
+            if matrices.ndim == 2:
+                matrices = matrices[np.newaxis]
+            for idx, adj_matrix in enumerate(matrices):
+                yield path + ':' + str(idx), adj_matrix
+        else:
+            graph_file = sys.stdin if path == '-' else open(path)
+            try:
+                for line_num, line in enumerate(graph_file):
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if isinstance(record, dict):
+                        graph_id = record.get('id', path + ':' + str(line_num))
+                        record = record['adj_matrix']
+                    else:
+                        graph_id = path + ':' + str(line_num)
+                    yield graph_id, np.array(record)
+            finally:
+                if graph_file is not sys.stdin:
+                    graph_file.close()
+
+
+def solve_graph(graph_id, adj_matrix, num_starts=1, num_iterations=None, num_layers=NUM_ANSATZ_LAYERS,
+                seed=None, dtype=np.complex128, optimizer_name='coordinate'):
+    """Find a cut for one graph, returning a JSON-serializable result"""
+    start_time = time.perf_counter()
+    num_nodes = adj_matrix.shape[0]
+
+    tape_key = (num_nodes, num_layers, np.dtype(dtype).name)
+    if tape_key not in _ansatz_tapes:
+        _ansatz_tapes[tape_key] = create_ansatz_model(num_nodes, num_layers, dtype).get_gate_tape()
+    gate_tape = _ansatz_tapes[tape_key]
+
+    eigenvalues, shift = maxcut_diagonal(adj_matrix)
+
+    optimizer_class = OPTIMIZERS[optimizer_name]
+    best_result = None
+    num_evaluations = 0
+    start_seeds = np.random.SeedSequence(seed).spawn(num_starts)
+    for start_num in range(num_starts):
+        initial_rotations = initial_rotations_for_start(gate_tape.num_params, start_num, start_seeds[start_num],
+                                                        random_first=optimizer_class.uses_gradient)
+        if num_iterations is None:
+            optimizer = optimizer_class(initial_rotations)
+        else:
+            optimizer = optimizer_class(initial_rotations, num_iterations)
+        result = optimizer.minimize(gate_tape, eigenvalues)
+        num_evaluations += result.num_evaluations
+        if best_result is None or result.cost < best_result.cost:
+            best_result = result
+
+    # Node i is on the side of the cut given by bit i of the basis state
+    basis_state_idx = best_result.basis_state_idx
+    return {
+        'id': graph_id,
+        'num_nodes': num_nodes,
+        'expectation_value': float(best_result.cost),
+        'basis_state': format(basis_state_idx, '0' + str(num_nodes) + 'b'),
+        'partition': [(basis_state_idx >> node) & 1 for node in range(num_nodes)],
+        'cut_weight': float(-(eigenvalues[basis_state_idx] + shift)),
+        'max_cut_weight': float(-(eigenvalues.min() + shift)),
+        'rotations': best_result.rotations.tolist(),
+        'num_evaluations': num_evaluations,
+        'seconds': time.perf_counter() - start_time,
+    }
+
+
+def _solve_graph_args(args):
+    return solve_graph(*args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='vqe-playground-batch', description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='JSONL or .npy files of adjacency matrices, or - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='JSONL file for the results (default: stdout)')
+    parser.add_argument('--starts', type=int, default=1, help='optimizer starts per graph')
+    parser.add_argument('--optimizer', choices=sorted(OPTIMIZERS), default='coordinate')
+    parser.add_argument('--iterations', '--epochs', type=int, default=None,
+                        help='optimizer iterations per start, or epochs for coordinate search '
+                             '(default: depends on the optimizer)')
+    parser.add_argument('--layers', type=int, default=NUM_ANSATZ_LAYERS, help='rotation layers in the ansatz')
+    parser.add_argument('--seed', type=int, default=None, help='seed for the random starting angles')
+    parser.add_argument('--dtype', choices=['complex64', 'complex128'], default='complex128')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    batch_start_time = time.perf_counter()
+    num_graphs = 0
+
+    def write_result(result):
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+    def solve_args(graph_id, adj_matrix):
+        return (graph_id, adj_matrix, args.starts, args.iterations, args.layers, args.seed,
+                np.dtype(args.dtype), args.optimizer)
+
+    try:
+        if args.workers <= 1:
+            for graph_id, adj_matrix in read_graphs(args.inputs):
+                write_result(solve_graph(*solve_args(graph_id, adj_matrix)))
+                num_graphs += 1
+        else:
+            # Bound the number of graphs in flight, so results stream out in input order
+            # without reading every graph up front
+            max_pending = args.workers * 4
+            with ProcessPoolExecutor(max_workers=args.workers) as executor:
+                pending = collections.deque()
+                for graph_id, adj_matrix in read_graphs(args.inputs):
+                    pending.append(executor.submit(_solve_graph_args, solve_args(graph_id, adj_matrix)))
+                    if len(pending) >= max_pending:
+                        write_result(pending.popleft().result())
+                        num_graphs += 1
+                while pending:
+                    write_result(pending.popleft().result())
+                    num_graphs += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - batch_start_time
+    print('Solved ' + str(num_graphs) + ' graphs in ' + str(round(elapsed, 2)) + ' seconds', file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,21 @@
+import argparse
+import os
+
 from .vqe_main import VQEPlayground
 
 
-def main():
-    VQEPlayground().main()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Demonstrate Variational Quantum Eigensolver (VQE) concepts')
+    parser.add_argument('--record', metavar='PATH', help='record input events to PATH')
+    parser.add_argument('--replay', metavar='PATH',
+                        help='replay input events recorded with --record, without a window, and report how '
+                             'long each type of event takes to reach the display')
+    parser.add_argument('--latency-csv', metavar='PATH', help='also write the replay latencies to a CSV file')
+    parser.add_argument('--show-window', action='store_true', help='show the window while replaying')
+    args = parser.parse_args(argv)
+
+    if args.replay and not args.show_window:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    VQEPlayground(args.record, args.replay, args.latency_csv).main()
@@ -93,11 +93,17 @@ class AdjacencyMatrix(pygame.sprite.RenderPlain):
             next_ypos += picker.rect.height
 
     def handle_element_clicked(self, picker):
+        """Step the weight of the clicked edge.
+
+        Returns (row, col, change in weight) for the edited edge,
+        or None if the picker isn't an editable edge.
+        """
         for idx, picker_in_list in enumerate(self.number_pickers_list):
             if picker == picker_in_list:
                 row = idx // self.num_nodes
                 col = idx % self.num_nodes
                 if row != col:
+                    orig_number = picker_in_list.number
                     if isclose(picker_in_list.number, 0):
                         picker_in_list.number = 1
                         self.adj_matrix_graph_dirty = True
@@ -116,3 +122,6 @@ class AdjacencyMatrix(pygame.sprite.RenderPlain):
                     other_picker.number = picker_in_list.number
                     other_picker.draw_number_picker()
                     self.adj_matrix_numeric[col, row] = picker_in_list.number
+
+                    return row, col, picker_in_list.number - orig_number
+        return None
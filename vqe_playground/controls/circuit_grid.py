@@ -14,8 +14,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import functools
+
 import pygame
 import numpy as np
+from vqe_playground.profiler import profiled
 from vqe_playground.utils.colors import *
 from vqe_playground.utils.navigation import *
 from vqe_playground.utils.resources import *
@@ -30,6 +33,11 @@ GATE_TILE_HEIGHT = 45
 
 LINE_WIDTH = 1
 
+# Rotation arcs are drawn to the nearest 1/ROTATION_ARC_STEPS of a turn, which
+# includes every multiple of pi/8, and the most recently used are cached
+ROTATION_ARC_STEPS = 720
+ROTATED_GATE_CACHE_SIZE = 512
+
 
 class CircuitGrid(pygame.sprite.RenderPlain):
     """Enables interaction with circuit"""
@@ -39,6 +47,9 @@ class CircuitGrid(pygame.sprite.RenderPlain):
         self.circuit_grid_model = circuit_grid_model
         self.selected_wire = 0
         self.selected_column = 0
+
+        # Version of the model that the gate tiles were last updated for
+        self.tiles_version = None
         self.circuit_grid_background = CircuitGridBackground(circuit_grid_model)
         self.circuit_grid_cursor = CircuitGridCursor()
         self.gate_tiles = np.empty((circuit_grid_model.max_wires,
@@ -49,29 +60,33 @@ class CircuitGrid(pygame.sprite.RenderPlain):
             for col_idx in range(self.circuit_grid_model.max_columns):
                 self.gate_tiles[row_idx][col_idx] = \
                     CircuitGridGate(circuit_grid_model, row_idx, col_idx)
+                self.gate_tiles[row_idx][col_idx].rect.centerx = \
+                    self.xpos + GRID_WIDTH * (col_idx + 1.5)
+                self.gate_tiles[row_idx][col_idx].rect.centery = \
+                    self.ypos + GRID_HEIGHT * (row_idx + 1.0)
 
         pygame.sprite.RenderPlain.__init__(self, self.circuit_grid_background,
                                            self.gate_tiles,
                                            self.circuit_grid_cursor)
         self.update()
 
+    @profiled('CircuitGrid.update')
     def update(self, *args):
         # print("in CircuitGrid#update()")
 
-        sprite_list = self.sprites()
-        for sprite in sprite_list:
-            sprite.update()
+        # Only the tiles of rotation gates change when just their angles have
+        version = self.circuit_grid_model.get_version()
+        if self.tiles_version is None or version[0] != self.tiles_version[0]:
+            for sprite in self.sprites():
+                sprite.update()
+        elif version[1] != self.tiles_version[1]:
+            for node in self.circuit_grid_model.get_rotation_gate_nodes():
+                self.gate_tiles[node.wire_num][node.column_num].update()
+        self.tiles_version = version
 
         self.circuit_grid_background.rect.left = self.xpos
         self.circuit_grid_background.rect.top = self.ypos
 
-        for row_idx in range(self.circuit_grid_model.max_wires):
-            for col_idx in range(self.circuit_grid_model.max_columns):
-                self.gate_tiles[row_idx][col_idx].rect.centerx = \
-                    self.xpos + GRID_WIDTH * (col_idx + 1.5)
-                self.gate_tiles[row_idx][col_idx].rect.centery = \
-                    self.ypos + GRID_HEIGHT * (row_idx + 1.0)
-
         self.highlight_selected_node(self.selected_wire, self.selected_column)
 
     def highlight_selected_node(self, wire_num, column_num):
@@ -233,8 +248,8 @@ class CircuitGrid(pygame.sprite.RenderPlain):
 
             # Don't allow rotation of controlled X or Y gates
             if circuit_grid_node.ctrl_a == -1:
-                circuit_grid_node.radians = (circuit_grid_node.radians + radians) % (2 * np.pi)
-                self.circuit_grid_model.set_node(self.selected_wire, self.selected_column, circuit_grid_node)
+                self.circuit_grid_model.set_node_radians(self.selected_wire, self.selected_column,
+                                                         (circuit_grid_node.radians + radians) % (2 * np.pi))
             # TODO: Handle crz correctly
             # elif selected_node_gate_part == node_types.Z:
 
@@ -248,8 +263,7 @@ class CircuitGrid(pygame.sprite.RenderPlain):
 
             # Don't allow rotation of controlled X or Y gates
             if circuit_grid_node.ctrl_a == -1:
-                circuit_grid_node.radians = radians
-                self.circuit_grid_model.set_node(gate_node.wire_num, gate_node.column_num, circuit_grid_node)
+                self.circuit_grid_model.set_node_radians(gate_node.wire_num, gate_node.column_num, radians)
             # TODO: Handle crz correctly
             # elif selected_node_gate_part == node_types.Z:
 
@@ -331,75 +345,105 @@ class CircuitGridGate(pygame.sprite.Sprite):
         self.circuit_grid_model = circuit_grid_model
         self.wire_num = wire_num
         self.column_num = column_num
+        self.image = None
+        self.rect = None
+
+        # The image name and quantized rotation angle currently shown, so
+        # that the image is only replaced when the node looks different
+        self.appearance = None
 
         self.update()
 
     def update(self):
+        appearance = self.calc_appearance()
+        if appearance == self.appearance:
+            return
+        self.appearance = appearance
+
+        image_name, angle_step = appearance
+        if image_name is None:
+            self.image = pygame.Surface([GATE_TILE_WIDTH, GATE_TILE_HEIGHT])
+            self.image.set_alpha(0)
+        elif angle_step is None:
+            self.image, _ = load_cached_image(image_name, -1)
+        else:
+            self.image = rotated_gate_image(image_name, angle_step)
+
+        # Tiles are positioned by the grid when they are created, and keep their place
+        self.rect = self.image.get_rect(center=self.rect.center if self.rect else (0, 0))
+
+    def calc_appearance(self):
+        """The gate image to show, and the rotation angle in steps of ROTATION_ARC_STEPS, or None"""
         node_type = self.circuit_grid_model.get_node_gate_part(self.wire_num, self.column_num)
 
-        if node_type == node_types.H:
-            self.image, self.rect = load_image('gate_images/h_gate.png', -1)
+        # Most nodes are empty, so check for them first
+        if node_type == node_types.EMPTY:
+            return None, None
+        elif node_type == node_types.H:
+            return 'gate_images/h_gate.png', None
         elif node_type == node_types.X:
             node = self.circuit_grid_model.get_node(self.wire_num, self.column_num)
             if node.ctrl_a >= 0 or node.ctrl_b >= 0:
                 # This is a control-X gate or Toffoli gate
                 # TODO: Handle Toffoli gates more completely
                 if self.wire_num > max(node.ctrl_a, node.ctrl_b):
-                    self.image, self.rect = load_image('gate_images/not_gate_below_ctrl.png', -1)
+                    return 'gate_images/not_gate_below_ctrl.png', None
                 else:
-                    self.image, self.rect = load_image('gate_images/not_gate_above_ctrl.png', -1)
+                    return 'gate_images/not_gate_above_ctrl.png', None
             elif node.radians != 0:
-                self.image, self.rect = load_image('gate_images/rx_gate.png', -1)
-                self.rect = self.image.get_rect()
-                pygame.draw.arc(self.image, MAGENTA, self.rect, 0, node.radians % (2 * np.pi), 6)
-                pygame.draw.arc(self.image, MAGENTA, self.rect, node.radians % (2 * np.pi), 2 * np.pi, 1)
+                return 'gate_images/rx_gate.png', quantize_rotation_angle(node.radians)
             else:
-                self.image, self.rect = load_image('gate_images/x_gate.png', -1)
+                return 'gate_images/x_gate.png', None
         elif node_type == node_types.Y:
             node = self.circuit_grid_model.get_node(self.wire_num, self.column_num)
             if node.radians != 0:
-                self.image, self.rect = load_image('gate_images/ry_gate.png', -1)
-                self.rect = self.image.get_rect()
-                pygame.draw.arc(self.image, MAGENTA, self.rect, 0, node.radians % (2 * np.pi), 6)
-                pygame.draw.arc(self.image, MAGENTA, self.rect, node.radians % (2 * np.pi), 2 * np.pi, 1)
+                return 'gate_images/ry_gate.png', quantize_rotation_angle(node.radians)
             else:
-                self.image, self.rect = load_image('gate_images/y_gate.png', -1)
+                return 'gate_images/y_gate.png', None
         elif node_type == node_types.Z:
             node = self.circuit_grid_model.get_node(self.wire_num, self.column_num)
             if node.radians != 0:
-                self.image, self.rect = load_image('gate_images/rz_gate.png', -1)
-                self.rect = self.image.get_rect()
-                pygame.draw.arc(self.image, MAGENTA, self.rect, 0, node.radians % (2 * np.pi), 6)
-                pygame.draw.arc(self.image, MAGENTA, self.rect, node.radians % (2 * np.pi), 2 * np.pi, 1)
+                return 'gate_images/rz_gate.png', quantize_rotation_angle(node.radians)
             else:
-                self.image, self.rect = load_image('gate_images/z_gate.png', -1)
+                return 'gate_images/z_gate.png', None
         elif node_type == node_types.S:
-            self.image, self.rect = load_image('gate_images/s_gate.png', -1)
+            return 'gate_images/s_gate.png', None
         elif node_type == node_types.SDG:
-            self.image, self.rect = load_image('gate_images/sdg_gate.png', -1)
+            return 'gate_images/sdg_gate.png', None
         elif node_type == node_types.T:
-            self.image, self.rect = load_image('gate_images/t_gate.png', -1)
+            return 'gate_images/t_gate.png', None
         elif node_type == node_types.TDG:
-            self.image, self.rect = load_image('gate_images/tdg_gate.png', -1)
+            return 'gate_images/tdg_gate.png', None
         elif node_type == node_types.IDEN:
-            self.image, self.rect = load_image('gate_images/iden_gate.png', -1)
+            return 'gate_images/iden_gate.png', None
         elif node_type == node_types.CTRL:
             # TODO: Handle Toffoli gates correctly
             if self.wire_num > \
                     self.circuit_grid_model.get_gate_wire_for_control_node(self.wire_num, self.column_num):
-                self.image, self.rect = load_image('gate_images/ctrl_gate_bottom_wire.png', -1)
+                return 'gate_images/ctrl_gate_bottom_wire.png', None
             else:
-                self.image, self.rect = load_image('gate_images/ctrl_gate_top_wire.png', -1)
+                return 'gate_images/ctrl_gate_top_wire.png', None
         elif node_type == node_types.TRACE:
-            self.image, self.rect = load_image('gate_images/trace_gate.png', -1)
+            return 'gate_images/trace_gate.png', None
         elif node_type == node_types.SWAP:
-            self.image, self.rect = load_image('gate_images/swap_gate.png', -1)
-        else:
-            self.image = pygame.Surface([GATE_TILE_WIDTH, GATE_TILE_HEIGHT])
-            self.image.set_alpha(0)
-            self.rect = self.image.get_rect()
+            return 'gate_images/swap_gate.png', None
+        return None, None
 
-        self.image.convert()
+
+def quantize_rotation_angle(radians):
+    """Round an angle to the nearest step of the rotation arc, from 0 to ROTATION_ARC_STEPS inclusive"""
+    return int(round((radians % (2 * np.pi)) / (2 * np.pi) * ROTATION_ARC_STEPS))
+
+
+@functools.lru_cache(maxsize=ROTATED_GATE_CACHE_SIZE)
+def rotated_gate_image(image_name, angle_step):
+    """Gate image with an arc showing its rotation angle, shared by every tile that shows it"""
+    image = load_cached_image(image_name, -1)[0].copy()
+    rect = image.get_rect()
+    radians = angle_step * 2 * np.pi / ROTATION_ARC_STEPS
+    pygame.draw.arc(image, MAGENTA, rect, 0, radians, 6)
+    pygame.draw.arc(image, MAGENTA, rect, radians, 2 * np.pi, 1)
+    return image
 
 
 class CircuitGridCursor(pygame.sprite.Sprite):
@@ -48,7 +48,8 @@ class NumberPicker(pygame.sprite.Sprite):
         self.image = pygame.Surface([self.width, self.height])
         self.image.convert()
         self.image.fill(WHITE if self.enabled else LIGHT_GREY)
-        self.rect = self.image.get_rect()
+        # Keep the position the picker was arranged at
+        self.rect = self.image.get_rect(topleft=self.rect.topleft if self.rect else (0, 0))
 
         rectangle = pygame.Rect(0, 0, self.width, self.height)
         pygame.draw.rect(self.image, BLACK, rectangle, 1)
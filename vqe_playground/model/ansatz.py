@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+from .circuit_grid_model import CircuitGridModel, CircuitGridNode
+from . import circuit_node_types as node_types
+
+NUM_ANSATZ_LAYERS = 5
+
+
+def ansatz_num_columns(num_qubits, num_layers=NUM_ANSATZ_LAYERS):
+    return num_layers + (num_layers - 1) * (num_qubits - 1)
+
+
+def create_ansatz_model(num_qubits, num_layers=NUM_ANSATZ_LAYERS, dtype=np.complex128):
+    """Create a circuit grid with layers of Y rotations, separated by ladders of CNOT gates"""
+    circuit_grid_model = CircuitGridModel(num_qubits, ansatz_num_columns(num_qubits, num_layers), dtype)
+
+    column_num = 0
+    for layer_num in range(num_layers):
+        for wire_num in range(num_qubits):
+            circuit_grid_model.set_node(wire_num, column_num, CircuitGridNode(node_types.Y, np.pi))
+        column_num += 1
+
+        if layer_num < num_layers - 1:
+            for wire_num in range(1, num_qubits):
+                circuit_grid_model.set_node(wire_num, column_num, CircuitGridNode(node_types.X, 0, wire_num - 1))
+                column_num += 1
+
+    return circuit_grid_model
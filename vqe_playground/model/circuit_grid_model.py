@@ -14,181 +14,351 @@
 # limitations under the License.
 #
 import numpy as np
-from qiskit import QuantumCircuit, QuantumRegister
+from vqe_playground.sim import gates
+from vqe_playground.sim.tape import GateTape
 from . import circuit_node_types as node_types
 
 
 class CircuitGridModel():
     """Grid-based model that is built when user interacts with circuit"""
-    def __init__(self, max_wires, max_columns):
+    def __init__(self, max_wires, max_columns, dtype=np.complex128):
         self.max_wires = max_wires
         self.max_columns = max_columns
-        self.nodes = np.empty((max_wires, max_columns),
-                                dtype = CircuitGridNode)
+        self.dtype = dtype
+
+        # Each field of the nodes is kept in its own array, so that queries
+        # over the whole grid are NumPy operations. get_node returns a view
+        # of one node in these arrays.
+        self.node_types = np.full((max_wires, max_columns), node_types.EMPTY, dtype=np.int8)
+        self.radians = np.zeros((max_wires, max_columns), dtype=np.float64)
+        self.ctrl_a = np.full((max_wires, max_columns), -1, dtype=np.int16)
+        self.ctrl_b = np.full((max_wires, max_columns), -1, dtype=np.int16)
+        self.swaps = np.full((max_wires, max_columns), -1, dtype=np.int16)
+
+        # For each node that is the control or swap part of gates elsewhere in its
+        # column, which part the node is and the wire of the gate it controls,
+        # kept up to date by set_node so that finding them doesn't mean
+        # searching the column
+        self.gate_wires = np.full((max_wires, max_columns), -1, dtype=np.int16)
+        self.gate_parts = np.full((max_wires, max_columns), node_types.EMPTY, dtype=np.int8)
+
+        # Bumped when nodes are set and when rotation angles change, so that
+        # anything derived from the circuit can tell whether it is out of date
+        self.structure_version = 0
+        self.param_version = 0
+
         self.latest_computed_circuit = None
+        self.latest_computed_circuit_version = None
+        self.rotation_gate_nodes = None
+        self.rotation_gate_indices = None
+        self.rotation_gate_nodes_version = None
+        self.gate_tape = None
+        self.param_slots = None
 
     def __str__(self):
         retval = ''
         for wire_num in range(self.max_wires):
             retval += '\n'
             for column_num in range(self.max_columns):
-                # retval += str(self.nodes[wire_num][column_num]) + ', '
+                # retval += str(self.get_node(wire_num, column_num)) + ', '
                 retval += str(self.get_node_gate_part(wire_num, column_num)) + ', '
         return 'CircuitGridModel: ' + retval
 
     def set_node(self, wire_num, column_num, circuit_grid_node):
-        # First, embed the wire and column locations in the node
+        # Read the fields before anything is written, as the node may be a view of another node
+        node_type, radians, ctrl_a, ctrl_b, swap = (circuit_grid_node.node_type, circuit_grid_node.radians,
+                                                    circuit_grid_node.ctrl_a, circuit_grid_node.ctrl_b,
+                                                    circuit_grid_node.swap)
+
+        # Embed the wire and column locations in the node
         circuit_grid_node.wire_num = wire_num
         circuit_grid_node.column_num = column_num
-        self.nodes[wire_num][column_num] = circuit_grid_node
+        self.node_types[wire_num, column_num] = node_type
+        self.radians[wire_num, column_num] = radians
+        self.ctrl_a[wire_num, column_num] = ctrl_a
+        self.ctrl_b[wire_num, column_num] = ctrl_b
+        self.swaps[wire_num, column_num] = swap
+        self.update_gate_part_index(column_num)
+
+        # Any node may change the structure of the circuit, so the gate tape must be recompiled
+        self.structure_version += 1
+        self.gate_tape = None
+
+    def update_gate_part_index(self, column_num):
+        """Index the control and swap parts of the gates in a column.
+
+        Several gates may share a control wire, so the whole column is
+        indexed again. The entries are what searching the column from the
+        top would find: a wire is the part it plays in the first gate that
+        uses it, and a control belongs to the last gate that it controls.
+        """
+        ctrl_a = self.ctrl_a[:, column_num].tolist()
+        ctrl_b = self.ctrl_b[:, column_num].tolist()
+        swaps = self.swaps[:, column_num].tolist()
+        gate_wires = [-1] * self.max_wires
+        gate_parts = [node_types.EMPTY] * self.max_wires
+
+        # Gates are visited from the bottom, so that parts of higher gates replace those of lower ones,
+        # and within a gate controls are visited after the swap, as they take precedence
+        for gate_wire_num in reversed(range(self.max_wires)):
+            for part_wire_num, part in ((swaps[gate_wire_num], node_types.SWAP),
+                                        (ctrl_b[gate_wire_num], node_types.CTRL),
+                                        (ctrl_a[gate_wire_num], node_types.CTRL)):
+                if 0 <= part_wire_num < self.max_wires and part_wire_num != gate_wire_num:
+                    gate_parts[part_wire_num] = part
+                    if part == node_types.CTRL and gate_wires[part_wire_num] == -1:
+                        gate_wires[part_wire_num] = gate_wire_num
+
+        self.gate_wires[:, column_num] = gate_wires
+        self.gate_parts[:, column_num] = gate_parts
+
+    def set_node_radians(self, wire_num, column_num, radians):
+        """Set the rotation angle of a node, reusing the compiled gate tape when possible"""
+        if self.radians[wire_num, column_num] == radians:
+            return
+        self.radians[wire_num, column_num] = radians
+        self.param_version += 1
+        if self.gate_tape is not None and (wire_num, column_num) in self.param_slots:
+            self.gate_tape.set_param(self.param_slots[(wire_num, column_num)], radians)
+        else:
+            self.gate_tape = None
 
-        # self.nodes[wire_num][column_num] = \
-        #     CircuitGridNode(circuit_grid_node.node_type,
-        #                     circuit_grid_node.radians,
-        #                     circuit_grid_node.ctrl_a,
-        #                     circuit_grid_node.ctrl_b,
-        #                     circuit_grid_node.swap)
+    def set_rotation_angles(self, radians):
+        """Set the angles of all the rotation gates, ordered as in get_rotation_gate_nodes"""
+        wire_nums, column_nums = self.get_rotation_gate_indices()
+        radians = np.asarray(radians, dtype=np.float64)
+        if radians.shape != wire_nums.shape:
+            raise ValueError('Expected ' + str(len(wire_nums)) + ' rotation angles, but got ' +
+                             str(radians.size))
+        if np.array_equal(self.radians[wire_nums, column_nums], radians):
+            return
+        self.radians[wire_nums, column_nums] = radians
+        self.param_version += 1
+        if self.gate_tape is not None:
+            # The gate tape's parameters are the rotation angles, in the same order
+            self.gate_tape.set_params(radians)
 
-        # TODO: Decide whether to protect as shown below
-        # if not self.nodes[wire_num][column_num]:
-        #     self.nodes[wire_num][column_num] = CircuitGridNode(node_type, radians)
-        # else:
-        #     print('Node ', wire_num, column_num, ' not empty')
+    def get_rotation_angles(self):
+        """Get the angles of all the rotation gates, ordered as in get_rotation_gate_nodes"""
+        wire_nums, column_nums = self.get_rotation_gate_indices()
+        return self.radians[wire_nums, column_nums]
 
     def get_node(self, wire_num, column_num):
-        return self.nodes[wire_num][column_num]
+        return CircuitGridNodeView(self, wire_num, column_num)
 
     def get_node_gate_part(self, wire_num, column_num):
-        requested_node = self.nodes[wire_num][column_num]
-        if requested_node and requested_node.node_type != node_types.EMPTY:
+        node_type = self.node_types.item(wire_num, column_num)
+        if node_type != node_types.EMPTY:
             # Node is occupied so return its gate
-            return requested_node.node_type
-        else:
-            # Check for control nodes from gates in other nodes in this column
-            nodes_in_column = self.nodes[:, column_num]
-            for idx in range(self.max_wires):
-                if idx != wire_num:
-                    other_node = nodes_in_column[idx]
-                    if other_node:
-                        if other_node.ctrl_a == wire_num or other_node.ctrl_b == wire_num:
-                            return node_types.CTRL
-                        elif other_node.swap == wire_num:
-                            return node_types.SWAP
-
-        return node_types.EMPTY
+            return node_type
+
+        # Otherwise it may be a control or swap part of a gate in another node in this column
+        return self.gate_parts.item(wire_num, column_num)
 
     def get_gate_wire_for_control_node(self, control_wire_num, column_num):
         """Get wire for gate that belongs to a control node on the given wire"""
-        gate_wire_num = -1
-        nodes_in_column = self.nodes[:, column_num]
-        for wire_idx in range(self.max_wires):
-            if wire_idx != control_wire_num:
-                other_node = nodes_in_column[wire_idx]
-                if other_node:
-                    if other_node.ctrl_a == control_wire_num or \
-                            other_node.ctrl_b == control_wire_num:
-                        gate_wire_num =  wire_idx
-                        # print("Found gate: ",
-                        #       self.get_node_gate_part(gate_wire_num, column_num),
-                        #       " on wire: " , gate_wire_num)
-        return gate_wire_num
+        return self.gate_wires.item(control_wire_num, column_num)
+
+    def get_version(self):
+        """The structure and parameter versions, which change whenever the circuit does"""
+        return self.structure_version, self.param_version
 
     def get_rotation_gate_nodes(self):
-        rot_gate_nodes = []
-        for column_num in range(self.max_columns):
-            for wire_num in range(self.max_wires):
-                node = self.nodes[wire_num][column_num]
-                if node and node.ctrl_a == -1:
-                    if node.node_type == node_types.X or \
-                            node.node_type == node_types.Y or \
-                            node.node_type == node_types.Z:
-                        rot_gate_nodes.append(node)
-        return rot_gate_nodes
+        """Get the rotation gates in column order, searching the grid only if its structure has changed"""
+        self.get_rotation_gate_indices()
+        return list(self.rotation_gate_nodes)
+
+    def get_rotation_gate_indices(self):
+        """Get the wires and columns of the rotation gates, as arrays in column order"""
+        if self.rotation_gate_nodes_version != self.structure_version:
+            self.rotation_gate_indices = self.find_rotation_gate_indices()
+            wire_nums, column_nums = self.rotation_gate_indices
+            self.rotation_gate_nodes = [CircuitGridNodeView(self, wire_num, column_num)
+                                        for wire_num, column_num in zip(wire_nums.tolist(), column_nums.tolist())]
+            self.rotation_gate_nodes_version = self.structure_version
+        return self.rotation_gate_indices
+
+    def find_rotation_gate_indices(self):
+        is_rotation_gate = np.isin(self.node_types, (node_types.X, node_types.Y, node_types.Z)) & \
+            (self.ctrl_a == -1)
+        # Searching the transposed grid gives column order
+        column_nums, wire_nums = np.nonzero(is_rotation_gate.T)
+        return wire_nums, column_nums
+
+    def get_occupied_nodes(self):
+        """Get the nodes that aren't empty, in column order"""
+        column_nums, wire_nums = np.nonzero(self.node_types.T != node_types.EMPTY)
+        return [CircuitGridNodeView(self, wire_num, column_num)
+                for wire_num, column_num in zip(wire_nums.tolist(), column_nums.tolist())]
+
+    def get_gate_tape(self):
+        """Get the compiled gate tape, compiling it only if the grid structure has changed"""
+        if self.gate_tape is None:
+            self.compile_gate_tape()
+        return self.gate_tape
+
+    def compute_statevector(self):
+        return self.get_gate_tape().run()
+
+    def evaluate_batch(self, param_sets, eigenvalues):
+        """Evaluate many sets of rotation angles, ordered as in get_rotation_gate_nodes, in one call.
+
+        Returns an array of expectation values of the diagonal observable
+        and an array of the most probable basis state indices.
+        """
+        return self.get_gate_tape().evaluate_batch(param_sets, eigenvalues)
 
+    def compute_rotation_gradient(self, eigenvalues, params=None):
+        """Gradient of the expectation value with respect to each node from get_rotation_gate_nodes.
+
+        Uses the current angles of the nodes unless params is supplied.
+        """
+        return self.get_gate_tape().gradient(eigenvalues, params)
+
+    def compile_gate_tape(self):
+        """Compile the grid into a GateTape.
+
+        Every node returned by get_rotation_gate_nodes gets a parameter slot,
+        numbered in the same order, so its angle can change without recompiling.
+        """
+        opcodes, targets, ctrl_a, ctrl_b, swaps, param_slots, angles, columns = ([] for _ in range(8))
+        params = []
+        self.param_slots = {}
+
+        def emit(opcode, wire_num, column_num, controls=(-1, -1), swap=-1, slot=-1, angle=0.0):
+            opcodes.append(opcode)
+            targets.append(wire_num)
+            ctrl_a.append(controls[0])
+            ctrl_b.append(controls[1])
+            swaps.append(swap)
+            param_slots.append(slot)
+            angles.append(angle)
+            columns.append(column_num)
+
+        rotation_opcodes = {node_types.X: gates.OP_RX, node_types.Y: gates.OP_RY, node_types.Z: gates.OP_RZ}
+        pauli_opcodes = {node_types.X: gates.OP_X, node_types.Y: gates.OP_Y, node_types.Z: gates.OP_Z}
+        fixed_opcodes = {node_types.S: gates.OP_S, node_types.SDG: gates.OP_SDG,
+                         node_types.T: gates.OP_T, node_types.TDG: gates.OP_TDG}
+
+        for node in self.get_occupied_nodes():
+            wire_num, column_num = node.wire_num, node.column_num
+            if node.node_type in rotation_opcodes:
+                if node.ctrl_a == -1:
+                    # Rotation gate, or Pauli gate when its angle is zero
+                    slot = len(params)
+                    self.param_slots[(wire_num, column_num)] = slot
+                    params.append(node.radians)
+                    emit(rotation_opcodes[node.node_type], wire_num, column_num, slot=slot)
+                elif node.radians == 0:
+                    # Controlled X (or Toffoli), Y or Z gate
+                    controls = (node.ctrl_a, node.ctrl_b if node.node_type == node_types.X else -1)
+                    emit(pauli_opcodes[node.node_type], wire_num, column_num, controls)
+                elif node.node_type == node_types.Z:
+                    # Controlled rotation around the Z axis
+                    emit(gates.OP_RZ, wire_num, column_num, (node.ctrl_a, -1), angle=node.radians)
+                else:
+                    # Rotation around X or Y axis, ignoring the control
+                    emit(rotation_opcodes[node.node_type], wire_num, column_num, angle=node.radians)
+            elif node.node_type in fixed_opcodes:
+                emit(fixed_opcodes[node.node_type], wire_num, column_num)
+            elif node.node_type == node_types.H:
+                emit(gates.OP_H, wire_num, column_num, (node.ctrl_a, -1))
+            elif node.node_type == node_types.SWAP:
+                emit(gates.OP_SWAP, wire_num, column_num, (node.ctrl_a, -1), swap=node.swap)
+
+        self.gate_tape = GateTape(self.max_wires, self.max_columns, opcodes, targets, ctrl_a, ctrl_b,
+                                  swaps, param_slots, angles, columns, params, self.dtype)
+        return self.gate_tape
 
     def compute_circuit(self):
+        """Build a QuantumCircuit from the grid, returning the same circuit until the grid changes"""
+        if self.latest_computed_circuit_version == self.get_version():
+            return self.latest_computed_circuit
+
+        # Imported here so that the model can be simulated without Qiskit installed
+        from qiskit import QuantumCircuit, QuantumRegister
+
         qr = QuantumRegister(self.max_wires, 'q')
         qc = QuantumCircuit(qr)
 
         # Add a column of identity gates to protect simulators from an empty circuit
         qc.id(qr)
 
-        for column_num in range(self.max_columns):
-            for wire_num in range(self.max_wires):
-                node = self.nodes[wire_num][column_num]
-                if node:
-                    if node.node_type == node_types.IDEN:
-                        # Identity gate
-                        qc.id(qr[wire_num])
-                    elif node.node_type == node_types.X:
-                        if node.radians == 0:
-                            if node.ctrl_a != -1:
-                                if node.ctrl_b != -1:
-                                    # Toffoli gate
-                                    qc.ccx(qr[node.ctrl_a], qr[node.ctrl_b], qr[wire_num])
-                                else:
-                                    # Controlled X gate
-                                    qc.cx(qr[node.ctrl_a], qr[wire_num])
-                            else:
-                                # Pauli-X gate
-                                qc.x(qr[wire_num])
-                        else:
-                            # Rotation around X axis
-                            qc.rx(node.radians, qr[wire_num])
-                    elif node.node_type == node_types.Y:
-                        if node.radians == 0:
-                            if node.ctrl_a != -1:
-                                # Controlled Y gate
-                                qc.cy(qr[node.ctrl_a], qr[wire_num])
-                            else:
-                                # Pauli-Y gate
-                                qc.y(qr[wire_num])
-                        else:
-                            # Rotation around Y axis
-                            qc.ry(node.radians, qr[wire_num])
-                    elif node.node_type == node_types.Z:
-                        if node.radians == 0:
-                            if node.ctrl_a != -1:
-                                # Controlled Z gate
-                                qc.cz(qr[node.ctrl_a], qr[wire_num])
-                            else:
-                                # Pauli-Z gate
-                                qc.z(qr[wire_num])
+        for node in self.get_occupied_nodes():
+            wire_num = node.wire_num
+            if node.node_type == node_types.IDEN:
+                # Identity gate
+                qc.id(qr[wire_num])
+            elif node.node_type == node_types.X:
+                if node.radians == 0:
+                    if node.ctrl_a != -1:
+                        if node.ctrl_b != -1:
+                            # Toffoli gate
+                            qc.ccx(qr[node.ctrl_a], qr[node.ctrl_b], qr[wire_num])
                         else:
-                            if node.ctrl_a != -1:
-                                # Controlled rotation around the Z axis
-                                qc.crz(node.radians, qr[node.ctrl_a], qr[wire_num])
-                            else:
-                                # Rotation around Z axis
-                                qc.rz(node.radians, qr[wire_num])
-                    elif node.node_type == node_types.S:
-                        # S gate
-                        qc.s(qr[wire_num])
-                    elif node.node_type == node_types.SDG:
-                        # S dagger gate
-                        qc.sdg(qr[wire_num])
-                    elif node.node_type == node_types.T:
-                        # T gate
-                        qc.t(qr[wire_num])
-                    elif node.node_type == node_types.TDG:
-                        # T dagger gate
-                        qc.tdg(qr[wire_num])
-                    elif node.node_type == node_types.H:
-                        if node.ctrl_a != -1:
-                            # Controlled Hadamard
-                            qc.ch(qr[node.ctrl_a], qr[wire_num])
-                        else:
-                            # Hadamard gate
-                            qc.h(qr[wire_num])
-                    elif node.node_type == node_types.SWAP:
-                        if node.ctrl_a != -1:
-                            # Controlled Swap
-                            qc.cswap(qr[node.ctrl_a], qr[wire_num], qr[node.swap])
-                        else:
-                            # Swap gate
-                            qc.swap(qr[wire_num], qr[node.swap])
+                            # Controlled X gate
+                            qc.cx(qr[node.ctrl_a], qr[wire_num])
+                    else:
+                        # Pauli-X gate
+                        qc.x(qr[wire_num])
+                else:
+                    # Rotation around X axis
+                    qc.rx(node.radians, qr[wire_num])
+            elif node.node_type == node_types.Y:
+                if node.radians == 0:
+                    if node.ctrl_a != -1:
+                        # Controlled Y gate
+                        qc.cy(qr[node.ctrl_a], qr[wire_num])
+                    else:
+                        # Pauli-Y gate
+                        qc.y(qr[wire_num])
+                else:
+                    # Rotation around Y axis
+                    qc.ry(node.radians, qr[wire_num])
+            elif node.node_type == node_types.Z:
+                if node.radians == 0:
+                    if node.ctrl_a != -1:
+                        # Controlled Z gate
+                        qc.cz(qr[node.ctrl_a], qr[wire_num])
+                    else:
+                        # Pauli-Z gate
+                        qc.z(qr[wire_num])
+                else:
+                    if node.ctrl_a != -1:
+                        # Controlled rotation around the Z axis
+                        qc.crz(node.radians, qr[node.ctrl_a], qr[wire_num])
+                    else:
+                        # Rotation around Z axis
+                        qc.rz(node.radians, qr[wire_num])
+            elif node.node_type == node_types.S:
+                # S gate
+                qc.s(qr[wire_num])
+            elif node.node_type == node_types.SDG:
+                # S dagger gate
+                qc.sdg(qr[wire_num])
+            elif node.node_type == node_types.T:
+                # T gate
+                qc.t(qr[wire_num])
+            elif node.node_type == node_types.TDG:
+                # T dagger gate
+                qc.tdg(qr[wire_num])
+            elif node.node_type == node_types.H:
+                if node.ctrl_a != -1:
+                    # Controlled Hadamard
+                    qc.ch(qr[node.ctrl_a], qr[wire_num])
+                else:
+                    # Hadamard gate
+                    qc.h(qr[wire_num])
+            elif node.node_type == node_types.SWAP:
+                if node.ctrl_a != -1:
+                    # Controlled Swap
+                    qc.cswap(qr[node.ctrl_a], qr[wire_num], qr[node.swap])
+                else:
+                    # Swap gate
+                    qc.swap(qr[wire_num], qr[node.swap])
 
         self.latest_computed_circuit = qc
+        self.latest_computed_circuit_version = self.get_version()
         return qc
 
 
@@ -209,3 +379,36 @@ class CircuitGridNode():
         string += ', ctrl_a: ' + str(self.ctrl_a) if self.ctrl_a != -1 else ''
         string += ', ctrl_b: ' + str(self.ctrl_b) if self.ctrl_b != -1 else ''
         return string
+
+
+def grid_property(array_name):
+    """A property of a CircuitGridNodeView that reads and writes one of its model's arrays"""
+    def get_value(node):
+        return getattr(node.model, array_name).item(node.wire_num, node.column_num)
+
+    def set_value(node, value):
+        getattr(node.model, array_name)[node.wire_num, node.column_num] = value
+
+    return property(get_value, set_value)
+
+
+class CircuitGridNodeView(CircuitGridNode):
+    """A node of a CircuitGridModel, whose fields are read from and written to the model's arrays.
+
+    Changing a field directly doesn't update the model's index of gate parts
+    or its versions, so the node should then be set with set_node.
+    """
+    node_type = grid_property('node_types')
+    radians = grid_property('radians')
+    ctrl_a = grid_property('ctrl_a')
+    ctrl_b = grid_property('ctrl_b')
+    swap = grid_property('swaps')
+
+    def __init__(self, model, wire_num, column_num):
+        self.model = model
+        self.wire_num = wire_num
+        self.column_num = column_num
+
+    def copy(self):
+        """A node with the same fields, which doesn't change with the model"""
+        return CircuitGridNode(self.node_type, self.radians, self.ctrl_a, self.ctrl_b, self.swap)
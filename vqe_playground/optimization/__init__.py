@@ -0,0 +1,34 @@
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Module for optimizing circuit rotation angles outside of the UI"""
+from .optimizer import Optimizer, OptimizationResult
+from .coordinate_search import CoordinateSearch, coordinate_search
+from .spsa import SPSA
+from .adam import Adam
+from .rotosolve import Rotosolve
+from .scipy_optimizer import ScipyOptimizer, Cobyla, LBFGS
+from .multistart import MultiStartOptimizer, initial_rotations_for_start
+from .background import BackgroundOptimizer, OptimizationSnapshot
+
+# Optimizers that can be chosen by name
+OPTIMIZERS = {
+    'coordinate': CoordinateSearch,
+    'spsa': SPSA,
+    'adam': Adam,
+    'rotosolve': Rotosolve,
+    'cobyla': Cobyla,
+    'lbfgs': LBFGS,
+}
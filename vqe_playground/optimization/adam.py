@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from .optimizer import Optimizer
+
+
+class Adam(Optimizer):
+    """Adam gradient descent, with exact gradients from the parameter-shift rule.
+
+    Each step evaluates the current angles and two shifted copies per angle
+    as one batch. Stops after max_iterations, or once every component of
+    the gradient is smaller than tolerance.
+    """
+    zero_is_pauli = False
+    uses_gradient = True
+
+    def __init__(self, initial_rotations, max_iterations=100, learning_rate=0.1,
+                 beta_1=0.9, beta_2=0.999, epsilon=1e-8, tolerance=1e-6):
+        super().__init__(initial_rotations, max_iterations)
+        self.learning_rate = learning_rate
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+        self.tolerance = tolerance
+
+    def _iterate(self):
+        first_moment = np.zeros(len(self.rotations))
+        second_moment = np.zeros(len(self.rotations))
+
+        for iteration in self._iterations():
+            cost, gradient = yield from self._evaluate_with_gradient(self.rotations)
+            if np.max(np.abs(gradient), initial=0) < self.tolerance:
+                return
+
+            first_moment = self.beta_1 * first_moment + (1 - self.beta_1) * gradient
+            second_moment = self.beta_2 * second_moment + (1 - self.beta_2) * gradient ** 2
+            corrected_first = first_moment / (1 - self.beta_1 ** (iteration + 1))
+            corrected_second = second_moment / (1 - self.beta_2 ** (iteration + 1))
+            step = self.learning_rate * corrected_first / (np.sqrt(corrected_second) + self.epsilon)
+            self.rotations = np.mod(self.rotations - step, 2 * np.pi)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import copy
+import queue
+import threading
+import time
+
+import numpy as np
+
+from vqe_playground.sim.statevector import expectation_values
+from .optimizer import OptimizationResult
+
+SNAPSHOT_INTERVAL = 1 / 30
+
+
+class OptimizationSnapshot(OptimizationResult):
+    """Progress of a running optimizer, with the rotation it is moving and whether it has finished"""
+    def __init__(self, rotations, cost, basis_state_idx, num_evaluations=0, cur_rotation_num=None, done=False):
+        super().__init__(rotations, cost, basis_state_idx, num_evaluations)
+        self.cur_rotation_num = cur_rotation_num
+        self.done = done
+
+
+class BackgroundOptimizer():
+    """Steps an Optimizer on a worker thread, publishing snapshots of its progress.
+
+    The worker simulates its own copies of the gate tape and eigenvalues, so
+    it runs as fast as the simulator allows while the caller keeps using, and
+    changing, the originals. A snapshot is published at most every
+    snapshot_interval seconds, and once more when the optimizer finishes. Call latest_snapshot() regularly, for
+    instance once per frame, to collect the most recent one without blocking.
+    """
+    def __init__(self, optimizer, gate_tape, eigenvalues, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.optimizer = optimizer
+        self.gate_tape = copy.deepcopy(gate_tape)
+        self.eigenvalues = np.array(eigenvalues)
+        self.snapshot_interval = snapshot_interval
+        self.snapshots = queue.Queue()
+        self.error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def latest_snapshot(self):
+        """The most recent snapshot published since the last call, or None if there isn't one"""
+        snapshot = None
+        while True:
+            try:
+                snapshot = self.snapshots.get_nowait()
+            except queue.Empty:
+                break
+        if self.error is not None:
+            raise self.error
+        return snapshot
+
+    def stop(self):
+        """Ask the worker to stop after its current step, and wait for it"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        try:
+            last_published = time.perf_counter()
+            while not self._stop_event.is_set() and not self.optimizer.done():
+                self.optimizer.step(self.gate_tape, self.eigenvalues)
+                if time.perf_counter() - last_published >= self.snapshot_interval:
+                    self._publish(done=False)
+                    last_published = time.perf_counter()
+            self._publish(done=True)
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.optimizer.close()
+
+    def _publish(self, done):
+        rotations = self.optimizer.reported_rotations()
+        self.gate_tape.set_params(rotations)
+        cost, basis_state_idx = expectation_values(self.gate_tape.run(), self.eigenvalues)
+        self.snapshots.put(OptimizationSnapshot(rotations, cost, int(basis_state_idx), self.optimizer.num_evaluations,
+                                                self.optimizer.cur_rotation_num, done))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from .optimizer import Optimizer
+
+MOVE_RADIANS = np.pi / 8
+
+
+class CoordinateSearch(Optimizer):
+    """Moves one rotation at a time in steps of move_radians, until a step doesn't improve the cost.
+
+    This is the optimizer that the playground has always used. Each rotation
+    starts moving towards pi, reverses if the first step makes things worse,
+    and stops moving once a step doesn't improve the cost. One candidate is
+    evaluated per step.
+    """
+    def __init__(self, initial_rotations, num_epochs=1, move_radians=MOVE_RADIANS):
+        super().__init__(initial_rotations, num_epochs)
+        self.move_radians = move_radians
+
+    def _iterate(self):
+        rotations = self.rotations
+        move_radians = self.move_radians
+
+        for epoch in self._iterations():
+            for rotation_num in range(len(rotations)):
+                self.cur_rotation_num = rotation_num
+                min_distance = yield from self._evaluate_one(rotations)
+                cur_ang_rad = rotations[rotation_num]
+                proposed_cur_ang_rad = cur_ang_rad
+
+                # Decide whether to increase or decrease angle
+                unit_direction = -1 if cur_ang_rad > np.pi else 1
+                proposed_cur_ang_rad += move_radians * unit_direction
+                if not 0.0 <= proposed_cur_ang_rad < np.pi * 2 + 0.01:
+                    continue
+
+                rotations[rotation_num] = proposed_cur_ang_rad
+                temp_distance = yield from self._evaluate_one(rotations)
+                if temp_distance > min_distance:
+                    # Moving in the wrong direction so restore the angle and switch direction
+                    rotations[rotation_num] = cur_ang_rad
+                    unit_direction *= -1
+                else:
+                    cur_ang_rad = proposed_cur_ang_rad
+                    min_distance = temp_distance
+
+                rotation_iterations = 0
+                while True:
+                    rotation_iterations += 1
+                    proposed_cur_ang_rad += move_radians * unit_direction
+                    if not 0.0 <= proposed_cur_ang_rad <= np.pi * 2 + 0.01:
+                        break
+                    rotations[rotation_num] = proposed_cur_ang_rad
+                    temp_distance = yield from self._evaluate_one(rotations)
+                    if temp_distance >= min_distance:
+                        # Distance is increasing so restore the angle and move on to the next rotation
+                        rotations[rotation_num] = cur_ang_rad
+                        break
+                    elif rotation_iterations > np.pi * 2 / move_radians:
+                        break
+                    cur_ang_rad = proposed_cur_ang_rad
+                    min_distance = temp_distance
+        self.cur_rotation_num = None
+
+
+def coordinate_search(gate_tape, eigenvalues, initial_rotations, num_epochs=1, move_radians=MOVE_RADIANS):
+    """Minimize the expectation value with a CoordinateSearch, without display updates in between.
+
+    The tape's column checkpoints mean each evaluation only re-simulates the
+    columns from the moving gate onwards.
+    """
+    return CoordinateSearch(initial_rotations, num_epochs, move_radians).minimize(gate_tape, eigenvalues)
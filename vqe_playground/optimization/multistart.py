@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import copy
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from vqe_playground.sim.statevector import expectation_values
+from .coordinate_search import CoordinateSearch
+from .optimizer import OptimizationResult
+
+DEFAULT_NUM_STARTS = 16
+PROGRESS_INTERVAL = 1 / 30
+
+# Set in each of the pool's processes by _init_worker
+_progress_queue = None
+_stop_event = None
+
+
+class MultiStartOptimizer():
+    """Runs independent coordinate searches from different starting angles across a process pool.
+
+    The first start uses the same angles as the interactive optimizer (every
+    rotation at pi). The others start from angles drawn uniformly from
+    [0, 2 pi) with their own seed, derived from the given seed. Call poll()
+    regularly to collect improvements without blocking. Each running start
+    sends back its current angles at most every progress_interval seconds,
+    so poll() reports a better result as soon as any start finds one.
+    """
+    def __init__(self, gate_tape, eigenvalues, num_starts=DEFAULT_NUM_STARTS, num_epochs=1,
+                 seed=None, max_workers=None, progress_interval=PROGRESS_INTERVAL):
+        # Copied, as the runs are only sent to the pool's processes once they start
+        self.gate_tape = copy.deepcopy(gate_tape)
+        self.eigenvalues = np.array(eigenvalues)
+        self.num_starts = num_starts
+        self.num_epochs = num_epochs
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.max_workers = max_workers or os.cpu_count()
+        self.progress_interval = progress_interval
+        self.executor = None
+        self.progress_queue = None
+        self.stop_event = None
+        self.futures = []
+        self.best_result = None
+
+    def start(self):
+        # Spawn rather than fork, as forking a process that has initialized SDL is unsafe
+        mp_context = multiprocessing.get_context('spawn')
+        # Queues and events can only be shared when a process is created, so hand them to the initializer
+        self.progress_queue = mp_context.Queue()
+        self.stop_event = mp_context.Event()
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp_context,
+                                            initializer=_init_worker,
+                                            initargs=(self.progress_queue, self.stop_event))
+        start_seeds = self.seed_sequence.spawn(self.num_starts)
+        self.futures = [self.executor.submit(_run_start, self.gate_tape, self.eigenvalues,
+                                             start_num, start_seeds[start_num], self.num_epochs,
+                                             self.progress_interval)
+                        for start_num in range(self.num_starts)]
+
+    def poll(self):
+        """Collect progress and finished runs, returning the new best result if any of them improved on it"""
+        improved = False
+        while True:
+            try:
+                result = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            improved = self._offer(result) or improved
+
+        still_running = []
+        for future in self.futures:
+            if not future.done():
+                still_running.append(future)
+                continue
+            improved = self._offer(future.result()) or improved
+        self.futures = still_running
+        return self.best_result if improved else None
+
+    def _offer(self, result):
+        if self.best_result is None or result.cost < self.best_result.cost:
+            self.best_result = result
+            return True
+        return False
+
+    def done(self):
+        return self.executor is not None and len(self.futures) == 0
+
+    def run(self):
+        """Run every start and wait for them all, returning the best result"""
+        self.start()
+        try:
+            for future in self.futures:
+                future.result()
+            self.poll()
+        finally:
+            self.shutdown()
+        return self.best_result
+
+    def shutdown(self):
+        """Cancel the runs that haven't started, and stop any that are running, discarding their results"""
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+        if self.executor is not None:
+            self.stop_event.set()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+def initial_rotations_for_start(num_params, start_num, start_seed, random_first=False):
+    """Starting angles for one of several starts: all pi for the first, unless random_first, otherwise random"""
+    if start_num == 0 and not random_first:
+        return np.full(num_params, np.pi)
+    return np.random.default_rng(start_seed).uniform(0, 2 * np.pi, num_params)
+
+
+def _init_worker(progress_queue, stop_event):
+    global _progress_queue, _stop_event
+    _progress_queue = progress_queue
+    _stop_event = stop_event
+    # Let the process exit without waiting for progress that nobody will read
+    _progress_queue.cancel_join_thread()
+
+
+def _run_start(gate_tape, eigenvalues, start_num, start_seed, num_epochs, progress_interval):
+    """Run one coordinate search, sending its angles back whenever they improve, at most every progress_interval"""
+    initial_rotations = initial_rotations_for_start(gate_tape.num_params, start_num, start_seed)
+    optimizer = CoordinateSearch(initial_rotations, num_epochs)
+    best_cost = None
+    last_sent = time.perf_counter()
+    while not optimizer.done() and not _stop_event.is_set():
+        optimizer.step(gate_tape, eigenvalues)
+        if time.perf_counter() - last_sent >= progress_interval:
+            last_sent = time.perf_counter()
+            rotations = optimizer.reported_rotations()
+            gate_tape.set_params(rotations)
+            cost, basis_state_idx = expectation_values(gate_tape.run(), eigenvalues)
+            if best_cost is None or cost < best_cost:
+                best_cost = cost
+                _progress_queue.put(OptimizationResult(rotations, cost, int(basis_state_idx),
+                                                       optimizer.num_evaluations, start_num))
+    optimizer.close()
+    result = optimizer._result(gate_tape, eigenvalues)
+    result.start_num = start_num
+    return result
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from vqe_playground.profiler import profiled
+from vqe_playground.sim.statevector import expectation_values
+
+
+class OptimizationResult():
+    """Rotation angles found by an optimizer, with their cost and most probable basis state"""
+    def __init__(self, rotations, cost, basis_state_idx, num_evaluations=0, start_num=0):
+        self.rotations = rotations
+        self.cost = cost
+        self.basis_state_idx = basis_state_idx
+        self.num_evaluations = num_evaluations
+        self.start_num = start_num
+
+
+class Optimizer():
+    """Base class for optimizers of rotation angles, driven one step at a time.
+
+    ask() returns an (M, num_params) array of candidate angles, and tell()
+    takes the M costs of those candidates. The caller decides how and when
+    to evaluate them, so the main loop can take one step per frame while a
+    script simply calls minimize(). The current best angles are in rotations.
+
+    Subclasses implement _iterate() as a generator that yields candidate
+    arrays and receives their costs. If zero_is_pauli is False, candidates
+    should be evaluated as pure rotations, even at an angle of exactly zero,
+    which gradient-based optimizers need. Those set uses_gradient, as they
+    can't move from a stationary point such as every angle at pi.
+    """
+    zero_is_pauli = True
+    uses_gradient = False
+
+    def __init__(self, initial_rotations, max_iterations=None):
+        self.rotations = np.array(initial_rotations, dtype=np.float64)
+        self.max_iterations = max_iterations
+        self.num_iterations = 0
+        self.num_evaluations = 0
+
+        # Index of the rotation being moved, for optimizers that move one at a time
+        self.cur_rotation_num = None
+
+        self._iteration = None
+        self._candidates = None
+
+    def ask(self):
+        """Candidate angles to evaluate next, or None when the optimizer is done"""
+        if self._iteration is None:
+            self._iteration = self._iterate()
+            self._candidates = next(self._iteration, None)
+        return self._candidates
+
+    def tell(self, costs):
+        """Costs of the candidates returned by the last call to ask()"""
+        self.num_evaluations += len(costs)
+        try:
+            self._candidates = self._iteration.send(np.asarray(costs, dtype=np.float64))
+        except StopIteration:
+            self._candidates = None
+
+    def done(self):
+        return self.ask() is None
+
+    @profiled('Optimizer.step')
+    def step(self, gate_tape, eigenvalues):
+        """Evaluate the next candidates on a GateTape, and tell the optimizer their costs"""
+        candidates = self.ask()
+        if candidates is not None:
+            self.tell(self._evaluate_on_tape(gate_tape, eigenvalues, candidates))
+
+    def minimize(self, gate_tape, eigenvalues):
+        """Step until done, returning the final rotations with their cost"""
+        while not self.done():
+            self.step(gate_tape, eigenvalues)
+        return self._result(gate_tape, eigenvalues)
+
+    def close(self):
+        """Stop the optimizer early, releasing anything it holds"""
+        if self._iteration is not None:
+            self._iteration.close()
+        else:
+            self._iteration = iter(())
+        self._candidates = None
+
+    def _evaluate_on_tape(self, gate_tape, eigenvalues, candidates):
+        if len(candidates) == 1 and self.zero_is_pauli:
+            # The tape only re-simulates the columns after the first changed parameter
+            for slot, radians in enumerate(candidates[0]):
+                gate_tape.set_param(slot, radians)
+            exp_val, _ = expectation_values(gate_tape.run(), eigenvalues)
+            return np.array([exp_val])
+        costs, _ = gate_tape.evaluate_batch(candidates, eigenvalues, self.zero_is_pauli)
+        return costs
+
+    def reported_rotations(self):
+        """A copy of the current rotations, in the form to apply to the circuit and report.
+
+        GateTape.run() applies a rotation of exactly zero as a Pauli gate. When
+        the optimizer evaluated candidates as pure rotations, such angles are
+        reported as a full turn instead, which is also the identity (up to a
+        global phase), so the circuit has the cost the optimizer minimized.
+        """
+        rotations = self.rotations.copy()
+        if not self.zero_is_pauli:
+            rotations[rotations == 0] = 2 * np.pi
+        return rotations
+
+    def _result(self, gate_tape, eigenvalues):
+        rotations = self.reported_rotations()
+        gate_tape.set_params(rotations)
+        cost, basis_state_idx = expectation_values(gate_tape.run(), eigenvalues)
+        return OptimizationResult(rotations, cost, int(basis_state_idx), self.num_evaluations)
+
+    def _iterate(self):
+        raise NotImplementedError
+
+    def _iterations(self):
+        """Count iterations, up to max_iterations if it is set"""
+        while self.max_iterations is None or self.num_iterations < self.max_iterations:
+            yield self.num_iterations
+            self.num_iterations += 1
+
+    def _evaluate(self, candidates):
+        """Yield candidates for evaluation, returning their costs"""
+        costs = yield np.array(candidates, dtype=np.float64, ndmin=2)
+        return costs
+
+    def _evaluate_one(self, rotations):
+        costs = yield from self._evaluate(rotations)
+        return costs[0]
+
+    def _evaluate_with_gradient(self, rotations):
+        """Yield rotations and their parameter-shifted copies, returning the cost and its gradient.
+
+        Every parameterized gate is a rotation exp(-i theta P / 2), so the
+        exact derivative is (E(theta + pi/2) - E(theta - pi/2)) / 2. The
+        candidates must be evaluated as pure rotations (zero_is_pauli False).
+        """
+        shifts = np.eye(len(rotations)) * (np.pi / 2)
+        costs = yield from self._evaluate(np.concatenate(([rotations], rotations + shifts, rotations - shifts)))
+        num_params = len(rotations)
+        return costs[0], (costs[1:num_params + 1] - costs[num_params + 1:]) / 2
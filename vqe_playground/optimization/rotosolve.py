@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from .optimizer import Optimizer
+
+
+class Rotosolve(Optimizer):
+    """Sets one rotation at a time to the angle that exactly minimizes the cost.
+
+    With the other angles fixed, the cost is a sinusoid in each rotation
+    angle, so three evaluations (at the current angle and shifted by +/- pi/2)
+    are enough to find its minimum. Each iteration is one sweep over every
+    rotation.
+    """
+    zero_is_pauli = False
+
+    def __init__(self, initial_rotations, max_iterations=3):
+        super().__init__(initial_rotations, max_iterations)
+
+    def _iterate(self):
+        for iteration in self._iterations():
+            for rotation_num in range(len(self.rotations)):
+                self.cur_rotation_num = rotation_num
+                shifted = np.tile(self.rotations, (3, 1))
+                shifted[1, rotation_num] += np.pi / 2
+                shifted[2, rotation_num] -= np.pi / 2
+                cost, cost_plus, cost_minus = yield from self._evaluate(shifted)
+
+                angle = self.rotations[rotation_num] - np.pi / 2 - \
+                    np.arctan2(2 * cost - cost_plus - cost_minus, cost_plus - cost_minus)
+                self.rotations[rotation_num] = np.mod(angle, 2 * np.pi)
+        self.cur_rotation_num = None
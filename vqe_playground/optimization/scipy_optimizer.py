@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import queue
+import threading
+
+import numpy as np
+
+from .optimizer import Optimizer
+
+
+class _Stopped(Exception):
+    pass
+
+
+class ScipyOptimizer(Optimizer):
+    """Runs scipy.optimize.minimize with one of its methods, one evaluation per step.
+
+    scipy.optimize.minimize calls the objective function itself, so when
+    stepped with ask() and tell() it runs in a thread whose objective function
+    hands each candidate over to ask() and waits for tell(). minimize() skips
+    the thread and evaluates candidates directly. When uses_gradient is True,
+    each candidate comes with its parameter-shifted copies so that the exact
+    gradient is supplied too.
+    """
+    method = None
+
+    def __init__(self, initial_rotations, max_iterations=200, options=None):
+        super().__init__(initial_rotations, max_iterations)
+        self.options = dict(options or {})
+        self.options.setdefault('maxiter', max_iterations)
+
+    def minimize(self, gate_tape, eigenvalues):
+        def objective(rotations):
+            evaluation = self._evaluate_candidate(rotations)
+            candidates = next(evaluation)
+            self.num_evaluations += len(candidates)
+            try:
+                evaluation.send(self._evaluate_on_tape(gate_tape, eigenvalues, candidates))
+            except StopIteration as stop:
+                return stop.value
+
+        self.rotations = np.mod(self._scipy_minimize(objective), 2 * np.pi)
+        return self._result(gate_tape, eigenvalues)
+
+    def _scipy_minimize(self, objective):
+        """Run scipy.optimize.minimize from the current rotations, returning the angles it found"""
+        # Imported here so that SciPy is only needed by these optimizers
+        from scipy.optimize import minimize
+
+        def count_iteration(*args):
+            self.num_iterations += 1
+
+        result = minimize(objective, self.rotations, method=self.method, jac=self.uses_gradient,
+                          callback=count_iteration, options=self.options)
+        return result.x
+
+    def _evaluate_candidate(self, rotations):
+        """Yield a candidate for evaluation, returning its cost, with its gradient if uses_gradient"""
+        if self.uses_gradient:
+            return (yield from self._evaluate_with_gradient(rotations))
+        return (yield from self._evaluate_one(rotations))
+
+    def _iterate(self):
+        requests = queue.Queue()
+        replies = queue.Queue()
+
+        def objective(rotations):
+            requests.put(('evaluate', rotations.copy()))
+            reply = replies.get()
+            if reply is None:
+                raise _Stopped()
+            return reply
+
+        def run_minimize():
+            try:
+                requests.put(('done', self._scipy_minimize(objective)))
+            except _Stopped:
+                requests.put(('done', None))
+            except Exception as exc:
+                requests.put(('error', exc))
+
+        thread = threading.Thread(target=run_minimize, daemon=True)
+        thread.start()
+        best_cost = None
+        try:
+            while True:
+                kind, value = requests.get()
+                if kind == 'done':
+                    if value is not None:
+                        self.rotations = np.mod(value, 2 * np.pi)
+                    return
+                elif kind == 'error':
+                    raise value
+
+                reply = yield from self._evaluate_candidate(value)
+                replies.put(reply)
+
+                # Show the best angles so far, as not every candidate improves on the last
+                cost = reply[0] if self.uses_gradient else reply
+                if best_cost is None or cost < best_cost:
+                    best_cost = cost
+                    self.rotations = np.mod(value, 2 * np.pi)
+        finally:
+            if thread.is_alive():
+                replies.put(None)
+                thread.join()
+
+
+class Cobyla(ScipyOptimizer):
+    """Constrained optimization by linear approximation, which needs no gradient"""
+    method = 'COBYLA'
+
+    def __init__(self, initial_rotations, max_iterations=200, options=None):
+        options = dict(options or {})
+        # COBYLA counts function evaluations rather than iterations, and starts with large steps
+        options.setdefault('rhobeg', np.pi / 4)
+        super().__init__(initial_rotations, max_iterations, options)
+
+
+class LBFGS(ScipyOptimizer):
+    """Limited-memory BFGS, with exact gradients from the parameter-shift rule"""
+    method = 'L-BFGS-B'
+    uses_gradient = True
+    zero_is_pauli = False
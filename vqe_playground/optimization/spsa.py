@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from .optimizer import Optimizer
+
+
+class SPSA(Optimizer):
+    """Simultaneous perturbation stochastic approximation.
+
+    Each step evaluates two candidates, with every angle perturbed at once by
+    +/- perturbation in a random direction, and moves the angles down the
+    resulting estimate of the gradient. The step size and perturbation decay
+    with the exponents recommended by Spall.
+    """
+    def __init__(self, initial_rotations, max_iterations=100, learning_rate=0.5, perturbation=0.2,
+                 alpha=0.602, gamma=0.101, seed=None):
+        super().__init__(initial_rotations, max_iterations)
+        self.learning_rate = learning_rate
+        self.perturbation = perturbation
+        self.alpha = alpha
+        self.gamma = gamma
+        self.rng = np.random.default_rng(seed)
+
+    def _iterate(self):
+        # Spall's stability constant, about a tenth of the number of iterations
+        stability_constant = 0.1 * (self.max_iterations or 100)
+
+        for iteration in self._iterations():
+            step_size = self.learning_rate / (iteration + 1 + stability_constant) ** self.alpha
+            perturbation = self.perturbation / (iteration + 1) ** self.gamma
+            delta = self.rng.choice((-1.0, 1.0), len(self.rotations))
+
+            cost_plus, cost_minus = yield from self._evaluate((self.rotations + perturbation * delta,
+                                                               self.rotations - perturbation * delta))
+            gradient = (cost_plus - cost_minus) / (2 * perturbation) * delta
+            self.rotations = np.mod(self.rotations - step_size * gradient, 2 * np.pi)
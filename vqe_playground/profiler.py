@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Timing of the stages of each frame, kept as rolling percentiles"""
+import collections
+import csv
+import functools
+import os
+import threading
+import time
+
+import numpy as np
+
+# Number of most recent timings kept for each stage
+ROLLING_WINDOW = 300
+
+PERCENTILES = 50, 90, 99
+
+CSV_COLUMNS = ['stage', 'count', 'mean_ms'] + ['p' + str(percentile) + '_ms' for percentile in PERCENTILES] + ['max_ms']
+
+
+class StageStats():
+    """Timings of one stage over the rolling window, in milliseconds"""
+    def __init__(self, stage, timings):
+        timings_ms = np.array(timings) * 1000
+        self.stage = stage
+        self.count = len(timings_ms)
+        self.mean = timings_ms.mean()
+        self.percentiles = np.percentile(timings_ms, PERCENTILES)
+        self.max = timings_ms.max()
+
+    def csv_row(self):
+        return [self.stage, self.count] + ['%.3f' % value for value in (self.mean, *self.percentiles, self.max)]
+
+
+class Profiler():
+    """Collects how long each named stage takes, while enabled.
+
+    Stages are timed either with the profiled decorator, or by passing the
+    value returned by start() to stop(). While the profiler is disabled
+    start() returns None and stop() does nothing, so that instrumented code
+    only pays for checking a flag. Stages may be timed from any thread.
+    """
+    def __init__(self, window=ROLLING_WINDOW):
+        # Set from the environment, the profiler stays enabled whatever the caller asks for
+        self.enabled_by_environment = os.environ.get('VQE_PLAYGROUND_PROFILE', '') not in ('', '0')
+        self.enabled = self.enabled_by_environment
+        self.window = window
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, stage, start):
+        if start is not None:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            if stage not in self.timings:
+                self.timings[stage] = collections.deque(maxlen=self.window)
+            self.timings[stage].append(seconds)
+
+    def stats(self):
+        """StageStats for every stage timed so far, in the order they were first timed"""
+        with self._lock:
+            timings = [(stage, list(stage_timings)) for stage, stage_timings in self.timings.items()]
+        return [StageStats(stage, stage_timings) for stage, stage_timings in timings]
+
+    def write_csv(self, path):
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(CSV_COLUMNS)
+            for stage_stats in self.stats():
+                writer.writerow(stage_stats.csv_row())
+
+    def clear(self):
+        with self._lock:
+            self.timings.clear()
+
+
+# Shared by all instrumented code
+PROFILER = Profiler()
+
+
+def profiled(stage):
+    """Decorator that times each call of a function as the given stage"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.record(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
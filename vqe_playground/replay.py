@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Recording of input events, and replaying them to measure how quickly the display responds.
+
+A recording is a JSON lines file. The first line describes the session, and
+each following line is one event, as [milliseconds since the session
+started, event name, event attributes].
+"""
+import json
+import time
+
+import pygame
+
+from .profiler import Profiler, PERCENTILES
+
+RECORDING_VERSION = 1
+
+# Attributes kept for each type of event that VQEPlayground handles
+RECORDED_ATTRIBUTES = {
+    pygame.KEYDOWN: ['key', 'mod'],
+    pygame.MOUSEBUTTONDOWN: ['pos', 'button'],
+    pygame.JOYBUTTONDOWN: ['button'],
+    pygame.JOYAXISMOTION: ['axis', 'value'],
+    pygame.QUIT: [],
+}
+
+EVENT_TYPES = {pygame.event.event_name(event_type): event_type for event_type in RECORDED_ATTRIBUTES}
+
+# Delay before quitting after the last event, when a recording doesn't end with QUIT
+QUIT_DELAY_MS = 2000
+
+
+class EventRecorder():
+    """Writes the input events handled by VQEPlayground to a file, as they happen"""
+    def __init__(self, path, num_qubits):
+        self.file = open(path, 'w')
+        self.start_time = None
+        self.write_line({'version': RECORDING_VERSION, 'num_qubits': num_qubits})
+
+    def start(self):
+        self.start_time = time.perf_counter()
+
+    def record(self, events):
+        for event in events:
+            if event.type in RECORDED_ATTRIBUTES:
+                attributes = {name: getattr(event, name) for name in RECORDED_ATTRIBUTES[event.type]}
+                elapsed_ms = round((time.perf_counter() - self.start_time) * 1000, 1)
+                self.write_line([elapsed_ms, pygame.event.event_name(event.type), attributes])
+
+    def write_line(self, value):
+        self.file.write(json.dumps(value, separators=(',', ':')) + '\n')
+        # Keep what has been recorded if the application crashes
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class EventReplay():
+    """Feeds the events from a recording back at the times they were recorded.
+
+    Each replayed event's latency runs from the time it was due to the end
+    of the frame that handled it, once that frame's changes have been drawn
+    and the display updated. Latencies are collected by event name in a
+    Profiler.
+    """
+    def __init__(self, path, num_qubits):
+        with open(path) as recording_file:
+            header = json.loads(recording_file.readline())
+            self.events = [json.loads(line) for line in recording_file if line.strip()]
+
+        if header.get('version') != RECORDING_VERSION:
+            raise SystemExit(path + ' is not a recording that this version can replay')
+        if header['num_qubits'] != num_qubits:
+            raise SystemExit(path + ' was recorded with ' + str(header['num_qubits']) + ' qubits, but ' +
+                             str(num_qubits) + ' are configured')
+
+        if not self.events or self.events[-1][1] != pygame.event.event_name(pygame.QUIT):
+            quit_ms = (self.events[-1][0] if self.events else 0) + QUIT_DELAY_MS
+            self.events.append([quit_ms, pygame.event.event_name(pygame.QUIT), {}])
+
+        self.latencies = Profiler(window=None)
+        self.latencies.enabled = True
+        self.start_time = None
+        self.next_event_num = 0
+        self.handled_events = []
+
+    def start(self):
+        self.start_time = time.perf_counter()
+
+    def due_events(self):
+        """Events that are due to be handled, remembering when each became due"""
+        elapsed_ms = (time.perf_counter() - self.start_time) * 1000
+        events = []
+        while self.next_event_num < len(self.events) and self.events[self.next_event_num][0] <= elapsed_ms:
+            event_ms, event_name, attributes = self.events[self.next_event_num]
+            event = pygame.event.Event(EVENT_TYPES[event_name], attributes)
+            events.append(event)
+            self.handled_events.append((event_name, self.start_time + event_ms / 1000))
+            self.next_event_num += 1
+        return events
+
+    def frame_presented(self):
+        """Record the latency of the events handled in the frame that has just been displayed"""
+        presented_time = time.perf_counter()
+        for event_name, due_time in self.handled_events:
+            self.latencies.record(event_name, presented_time - due_time)
+        self.handled_events = []
+
+    def print_report(self):
+        print('Input-to-display latency in milliseconds')
+        print('%-16s %6s %9s' % ('event', 'count', 'mean') +
+              ''.join(' %9s' % ('p' + str(percentile)) for percentile in PERCENTILES) + ' %9s' % 'max')
+        for stage_stats in self.latencies.stats():
+            print('%-16s %6d %9.2f' % (stage_stats.stage, stage_stats.count, stage_stats.mean) +
+                  ''.join(' %9.2f' % value for value in stage_stats.percentiles) + ' %9.2f' % stage_stats.max)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Single-qubit gate matrices, using the same conventions as Qiskit"""
+import numpy as np
+
+I_MATRIX = np.array([[1, 0], [0, 1]], dtype=complex)
+X_MATRIX = np.array([[0, 1], [1, 0]], dtype=complex)
+Y_MATRIX = np.array([[0, -1j], [1j, 0]], dtype=complex)
+Z_MATRIX = np.array([[1, 0], [0, -1]], dtype=complex)
+H_MATRIX = np.array([[1, 1], [1, -1]], dtype=complex) / np.sqrt(2)
+S_MATRIX = np.array([[1, 0], [0, 1j]], dtype=complex)
+SDG_MATRIX = np.array([[1, 0], [0, -1j]], dtype=complex)
+T_MATRIX = np.array([[1, 0], [0, np.exp(1j * np.pi / 4)]], dtype=complex)
+TDG_MATRIX = np.array([[1, 0], [0, np.exp(-1j * np.pi / 4)]], dtype=complex)
+
+FIXED_GATE_MATRICES = {
+    'id': I_MATRIX,
+    'x': X_MATRIX,
+    'y': Y_MATRIX,
+    'z': Z_MATRIX,
+    'h': H_MATRIX,
+    's': S_MATRIX,
+    'sdg': SDG_MATRIX,
+    't': T_MATRIX,
+    'tdg': TDG_MATRIX,
+}
+
+# Controlled gates, mapped to their target gate and number of control qubits
+CONTROLLED_GATES = {
+    'cx': ('x', 1),
+    'cy': ('y', 1),
+    'cz': ('z', 1),
+    'ch': ('h', 1),
+    'crz': ('rz', 1),
+    'ccx': ('x', 2),
+}
+
+
+def rx_matrix(theta):
+    cos = np.cos(theta / 2)
+    sin = np.sin(theta / 2)
+    return _stack_matrix([[cos, -1j * sin], [-1j * sin, cos]])
+
+
+def ry_matrix(theta):
+    cos = np.cos(theta / 2)
+    sin = np.sin(theta / 2)
+    return _stack_matrix([[cos, -sin], [sin, cos]])
+
+
+def rz_matrix(theta):
+    phase = np.exp(-0.5j * theta)
+    return _stack_matrix([[phase, np.zeros_like(phase)], [np.zeros_like(phase), np.conj(phase)]])
+
+
+def _stack_matrix(rows):
+    """Build a 2x2 matrix, or an array of them with shape (M, 2, 2) when the entries are arrays"""
+    return np.moveaxis(np.array(rows, dtype=complex), (0, 1), (-2, -1))
+
+
+ROTATION_GATE_MATRICES = {
+    'rx': rx_matrix,
+    'ry': ry_matrix,
+    'rz': rz_matrix,
+}
+
+
+def gate_matrix(name, params=()):
+    """Get the 2x2 matrix for a named single-qubit gate"""
+    if name in FIXED_GATE_MATRICES:
+        return FIXED_GATE_MATRICES[name]
+    elif name in ROTATION_GATE_MATRICES:
+        return ROTATION_GATE_MATRICES[name](float(params[0]))
+    raise ValueError('Unsupported gate: ' + name)
+
+
+# Opcodes for GateTape instructions
+OP_X = 1
+OP_Y = 2
+OP_Z = 3
+OP_H = 4
+OP_S = 5
+OP_SDG = 6
+OP_T = 7
+OP_TDG = 8
+OP_RX = 9
+OP_RY = 10
+OP_RZ = 11
+OP_SWAP = 12
+
+FIXED_OPCODE_MATRICES = {
+    OP_X: X_MATRIX,
+    OP_Y: Y_MATRIX,
+    OP_Z: Z_MATRIX,
+    OP_H: H_MATRIX,
+    OP_S: S_MATRIX,
+    OP_SDG: SDG_MATRIX,
+    OP_T: T_MATRIX,
+    OP_TDG: TDG_MATRIX,
+}
+
+# Rotation opcodes, mapped to their matrix function and the Pauli gate
+# that a circuit grid node shows when its rotation angle is zero
+ROTATION_OPCODES = {
+    OP_RX: (rx_matrix, X_MATRIX),
+    OP_RY: (ry_matrix, Y_MATRIX),
+    OP_RZ: (rz_matrix, Z_MATRIX),
+}
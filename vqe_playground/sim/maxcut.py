@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+
+def maxcut_diagonal(weight_matrix):
+    """Compute the diagonal of the MaxCut Ising Hamiltonian, and its shift.
+
+    Gives the same values as building the operator with Qiskit's
+    max_cut.get_operator and reading the diagonal of its matrix:
+    the Hamiltonian is the sum of 0.5 * w_ij * Z_i Z_j over edges i > j,
+    and the shift is minus the sum of 0.5 * w_ij.
+
+    The diagonal is built one node at a time. With the entries for nodes
+    0..j-1 known, node j's coupling to those nodes is added for the half of
+    the basis states where it is 0 and subtracted for the half where it is 1.
+    """
+    weight_matrix = np.asarray(weight_matrix)
+    num_nodes = weight_matrix.shape[0]
+    diagonal = np.zeros(1)
+    shift = 0.0
+    for j in range(num_nodes):
+        # Coupling of node j to nodes 0..j-1, for every assignment of those nodes
+        field = np.zeros(1)
+        for i in range(j):
+            coupling = 0.5 * weight_matrix[j, i]
+            field = np.concatenate((field + coupling, field - coupling))
+            shift -= coupling
+        diagonal = np.concatenate((diagonal + field, diagonal - field))
+    return diagonal, shift
+
+
+def update_maxcut_diagonal(diagonal, shift, i, j, delta_weight):
+    """Apply a change of delta_weight in the weight of edge (i, j) to a MaxCut diagonal, in place.
+
+    The edge contributes 0.5 * w_ij * Z_i Z_j, which is +0.5 * w_ij where
+    nodes i and j are on the same side of the cut and -0.5 * w_ij where they
+    aren't, so only those two slices of the diagonal change.
+    Returns the new shift.
+    """
+    num_nodes = len(diagonal).bit_length() - 1
+    coupling = 0.5 * delta_weight
+    diagonal_tensor = diagonal.reshape((2,) * num_nodes)
+    for bit_i in range(2):
+        for bit_j in range(2):
+            index = [slice(None)] * num_nodes
+            index[num_nodes - 1 - i] = bit_i
+            index[num_nodes - 1 - j] = bit_j
+            diagonal_tensor[tuple(index)] += coupling if bit_i == bit_j else -coupling
+    return shift - coupling
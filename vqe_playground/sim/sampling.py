@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Measurement sampling straight from statevector probabilities.
+
+Every function takes an rng argument, which may be a seed or a
+numpy.random.Generator, so that sampled results can be reproduced.
+"""
+import numpy as np
+
+
+def measurement_probabilities(statevector):
+    probabilities = np.abs(np.asarray(statevector, dtype=np.complex128)) ** 2
+    return probabilities / probabilities.sum()
+
+
+def sample_counts(probabilities, num_shots, rng=None):
+    """Number of times each basis state is measured in num_shots shots, from one multinomial draw"""
+    return np.random.default_rng(rng).multinomial(num_shots, probabilities)
+
+
+def sample_shots(probabilities, num_shots, rng=None):
+    """Basis state index measured in each of num_shots shots, by inverting the cumulative distribution"""
+    cumulative = np.cumsum(probabilities)
+    uniform = np.random.default_rng(rng).random(num_shots) * cumulative[-1]
+    return np.searchsorted(cumulative, uniform, side='right')
+
+
+def counts_dict(counts, num_qubits):
+    """Convert an array of counts to a dict keyed by bit string, like the counts of a Qiskit result"""
+    return {format(idx, '0' + str(num_qubits) + 'b'): int(counts[idx]) for idx in np.flatnonzero(counts)}
+
+
+def sampled_expectation_value(probabilities, eigenvalues, num_shots, rng=None):
+    """Estimate the expectation value of a diagonal observable from num_shots shots"""
+    return sample_counts(probabilities, num_shots, rng) @ eigenvalues / num_shots
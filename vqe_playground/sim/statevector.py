@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Vectorized statevector simulation with NumPy.
+
+Amplitudes are ordered as in Qiskit, so qubit 0 is the least significant
+bit of the basis state index. When the statevector is viewed as a tensor
+with one axis of length 2 per qubit, qubit q lives on axis num_qubits - 1 - q.
+"""
+import numpy as np
+
+from .gates import gate_matrix, CONTROLLED_GATES
+
+
+def zero_state(num_qubits, dtype=np.complex128, batch_size=None):
+    """Create the |00...0> statevector, or a stack of batch_size of them"""
+    shape = 2 ** num_qubits if batch_size is None else (batch_size, 2 ** num_qubits)
+    state = np.zeros(shape, dtype=dtype)
+    state[..., 0] = 1
+    return state
+
+
+def expectation_values(states, eigenvalues):
+    """Expectation values of a diagonal observable, and the most probable basis state index"""
+    probabilities = np.abs(states) ** 2
+    return probabilities @ eigenvalues, np.argmax(probabilities, axis=-1)
+
+
+def apply_gate(state, num_qubits, matrix, target, controls=()):
+    """Apply a 2x2 gate matrix to the target qubit, in place.
+
+    Uncontrolled gates are applied as a tensor contraction over the target
+    axis. Controlled gates only touch the slice of the statevector in which
+    every control qubit is 1.
+
+    The state may also be a stack of statevectors with shape (M, 2**num_qubits),
+    in which case the matrix is either shared or has shape (M, 2, 2).
+    """
+    matrix = matrix.astype(state.dtype, copy=False)
+    if len(controls) == 0:
+        if matrix.ndim == 3:
+            psi = state.reshape(len(matrix), -1, 2, 1 << target)
+            psi[...] = np.matmul(matrix[:, np.newaxis], psi)
+        else:
+            psi = state.reshape(-1, 2, 1 << target)
+            psi[...] = np.matmul(matrix, psi)
+        return state
+
+    psi, remaining = _controlled_view(state, num_qubits, controls)
+    _apply_to_axis(psi, matrix, _axis_for_qubit(target, remaining))
+    return state
+
+
+def apply_swap(state, num_qubits, qubit_a, qubit_b, controls=()):
+    """Swap two qubits, in place, optionally conditioned on control qubits"""
+    psi, remaining = _controlled_view(state, num_qubits, controls)
+    psi[...] = np.swapaxes(psi,
+                           _axis_for_qubit(qubit_a, remaining),
+                           _axis_for_qubit(qubit_b, remaining)).copy()
+    return state
+
+
+def simulate_circuit(circuit, dtype=np.complex128):
+    """Compute the final statevector of a QuantumCircuit without running a Qiskit job"""
+    num_qubits = len(circuit.qubits)
+    qubit_indices = {qubit: idx for idx, qubit in enumerate(circuit.qubits)}
+    state = zero_state(num_qubits, dtype)
+
+    for circuit_instruction in circuit.data:
+        instruction = circuit_instruction.operation
+        name = instruction.name
+        wires = [qubit_indices[qubit] for qubit in circuit_instruction.qubits]
+        if name == 'id' or name == 'barrier':
+            continue
+        elif name == 'swap':
+            apply_swap(state, num_qubits, wires[0], wires[1])
+        elif name == 'cswap':
+            apply_swap(state, num_qubits, wires[1], wires[2], wires[:1])
+        elif name in CONTROLLED_GATES:
+            target_name, num_controls = CONTROLLED_GATES[name]
+            apply_gate(state, num_qubits, gate_matrix(target_name, instruction.params),
+                       wires[num_controls], wires[:num_controls])
+        else:
+            apply_gate(state, num_qubits, gate_matrix(name, instruction.params), wires[0])
+    return state
+
+
+def _controlled_view(state, num_qubits, controls):
+    """View of the amplitudes whose control qubits are all 1, and the qubits left in that view"""
+    psi = state.reshape(state.shape[:-1] + (2,) * num_qubits)
+    index = [Ellipsis] + [slice(None)] * num_qubits
+    for control in controls:
+        index[num_qubits - control] = 1
+    remaining = [qubit for qubit in range(num_qubits) if qubit not in controls]
+    return psi[tuple(index)], remaining
+
+
+def _axis_for_qubit(qubit, remaining):
+    """Axis (counted from the end) holding a qubit in a view containing the remaining qubits"""
+    return -1 - sum(1 for other in remaining if other < qubit)
+
+
+def _apply_to_axis(psi, matrix, axis):
+    index_0 = [slice(None)] * psi.ndim
+    index_1 = [slice(None)] * psi.ndim
+    index_0[axis] = 0
+    index_1[axis] = 1
+    index_0 = tuple(index_0)
+    index_1 = tuple(index_1)
+
+    if matrix.ndim == 3:
+        # One matrix per statevector in the stack, broadcast over the remaining qubit axes
+        matrix = matrix.reshape(matrix.shape[:1] + (1,) * (psi.ndim - 2) + (2, 2))
+
+    amps_0 = psi[index_0].copy()
+    amps_1 = psi[index_1]
+    psi[index_0] = matrix[..., 0, 0] * amps_0 + matrix[..., 0, 1] * amps_1
+    psi[index_1] = matrix[..., 1, 0] * amps_0 + matrix[..., 1, 1] * amps_1
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+
+from .gates import FIXED_OPCODE_MATRICES, ROTATION_OPCODES, OP_SWAP
+from .statevector import zero_state, apply_gate, apply_swap, expectation_values
+
+CHECKPOINT_MEMORY_BUDGET = 256 * 1024 * 1024
+BATCH_MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+class GateTape():
+    """Compact, array-backed list of gate instructions.
+
+    Each instruction i is described by opcodes[i], targets[i], the control
+    wires ctrl_a[i] and ctrl_b[i], the second wire of a swap in swaps[i],
+    and the grid column it came from. Rotations either read their angle from
+    the params vector, at index param_slots[i], or use the fixed angles[i]
+    when param_slots[i] is -1. Unused wires and slots are -1.
+
+    A parameterized rotation whose angle is exactly zero is applied as the
+    corresponding Pauli gate, which is how the circuit grid treats it.
+
+    The statevector before each column is kept as a checkpoint, so that after
+    a parameter in column k changes, run() only re-applies columns k onwards.
+    When the checkpoints for every column would exceed
+    CHECKPOINT_MEMORY_BUDGET bytes, only every few columns are checkpointed.
+    See estimate_memory_bytes for the total memory needed to run a tape.
+    """
+    def __init__(self, num_qubits, num_columns, opcodes, targets, ctrl_a, ctrl_b,
+                 swaps, param_slots, angles, columns, params, dtype=np.complex128):
+        self.num_qubits = num_qubits
+        self.num_columns = num_columns
+        self.dtype = dtype
+        self.opcodes = np.asarray(opcodes, dtype=np.int8)
+        self.targets = np.asarray(targets, dtype=np.int16)
+        self.ctrl_a = np.asarray(ctrl_a, dtype=np.int16)
+        self.ctrl_b = np.asarray(ctrl_b, dtype=np.int16)
+        self.swaps = np.asarray(swaps, dtype=np.int16)
+        self.param_slots = np.asarray(param_slots, dtype=np.int16)
+        self.angles = np.asarray(angles, dtype=np.float64)
+        self.columns = np.asarray(columns, dtype=np.int16)
+        self.params = np.array(params, dtype=np.float64)
+
+        self.slot_columns = np.zeros(len(self.params), dtype=np.int16)
+        has_slot = self.param_slots != -1
+        self.slot_columns[self.param_slots[has_slot]] = self.columns[has_slot]
+
+        # Plain Python tuples are much faster to walk than NumPy scalars
+        self._instructions = []
+        self._column_instructions = [[] for _ in range(num_columns)]
+        for idx in range(len(self.opcodes)):
+            controls = tuple(int(wire) for wire in (self.ctrl_a[idx], self.ctrl_b[idx]) if wire != -1)
+            instruction = (int(self.opcodes[idx]),
+                           int(self.targets[idx]),
+                           controls,
+                           int(self.swaps[idx]),
+                           int(self.param_slots[idx]),
+                           float(self.angles[idx]))
+            self._instructions.append(instruction)
+            self._column_instructions[self.columns[idx]].append(instruction)
+
+        state_bytes = (2 ** num_qubits) * np.dtype(dtype).itemsize
+        self.checkpoint_stride = max(1, -(-(num_columns + 1) * state_bytes // CHECKPOINT_MEMORY_BUDGET))
+        self._checkpoints = {}
+        self._valid_columns = 0
+
+    def __len__(self):
+        return len(self._instructions)
+
+    def __getstate__(self):
+        # Checkpoints can be large and are cheap to rebuild, so don't pickle them
+        state = self.__dict__.copy()
+        state['_checkpoints'] = {}
+        state['_valid_columns'] = 0
+        return state
+
+    @property
+    def num_params(self):
+        return len(self.params)
+
+    def set_param(self, slot, radians):
+        if self.params[slot] != radians:
+            self.params[slot] = radians
+            self._valid_columns = min(self._valid_columns, self.slot_columns[slot])
+
+    def set_params(self, params):
+        """Set every parameter at once, recomputing from the leftmost one that changed"""
+        changed = self.params != params
+        if changed.any():
+            self.params[:] = params
+            self._valid_columns = min(self._valid_columns, self.slot_columns[changed].min())
+
+    def run(self, params=None):
+        """Compute the statevector.
+
+        With no arguments, the stored parameters are used and only the columns
+        after the leftmost changed parameter are recomputed. The returned array
+        is shared with the checkpoints, so it is read-only. If params is
+        supplied, the whole tape is run with it and the checkpoints are left alone.
+        """
+        if params is not None:
+            state = zero_state(self.num_qubits, self.dtype)
+            for instruction in self._instructions:
+                self._apply_instruction(state, instruction, params)
+            return state
+
+        # A tape with no columns has no checkpoint until its first run
+        if self._valid_columns < self.num_columns or self.num_columns not in self._checkpoints:
+            start_column = self._valid_columns - self._valid_columns % self.checkpoint_stride
+            if start_column == 0:
+                state = zero_state(self.num_qubits, self.dtype)
+            else:
+                state = self._checkpoints[start_column].copy()
+            for column_num in range(start_column, self.num_columns):
+                for instruction in self._column_instructions[column_num]:
+                    self._apply_instruction(state, instruction, self.params)
+                if (column_num + 1) % self.checkpoint_stride == 0 and column_num + 1 < self.num_columns:
+                    self._checkpoints[column_num + 1] = state.copy()
+            state.flags.writeable = False
+            self._checkpoints[self.num_columns] = state
+            self._valid_columns = self.num_columns
+        return self._checkpoints[self.num_columns]
+
+    def run_batch(self, param_sets, zero_is_pauli=True):
+        """Compute one statevector per row of the (M, num_params) array param_sets.
+
+        The M statevectors are evolved together as an (M, 2**num_qubits) array.
+        With zero_is_pauli False, a zero angle is treated as a plain rotation
+        by zero rather than as a Pauli gate.
+        """
+        param_sets = np.atleast_2d(np.asarray(param_sets, dtype=np.float64))
+        states = zero_state(self.num_qubits, self.dtype, len(param_sets))
+        params_by_slot = param_sets.T
+        for instruction in self._instructions:
+            self._apply_instruction(states, instruction, params_by_slot, zero_is_pauli)
+        return states
+
+    def evaluate_batch(self, param_sets, eigenvalues, zero_is_pauli=True):
+        """Expectation values of a diagonal observable for each row of param_sets.
+
+        Returns the M expectation values and the index of the most probable
+        basis state for each. Rows are simulated in chunks that stay within
+        BATCH_MEMORY_BUDGET bytes.
+        """
+        param_sets = np.atleast_2d(np.asarray(param_sets, dtype=np.float64))
+        state_bytes = (2 ** self.num_qubits) * np.dtype(self.dtype).itemsize
+        chunk_size = max(1, BATCH_MEMORY_BUDGET // state_bytes)
+
+        exp_vals = np.empty(len(param_sets))
+        basis_state_indices = np.empty(len(param_sets), dtype=np.int64)
+        for start in range(0, len(param_sets), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            exp_vals[chunk], basis_state_indices[chunk] = \
+                expectation_values(self.run_batch(param_sets[chunk], zero_is_pauli), eigenvalues)
+        return exp_vals, basis_state_indices
+
+    def gradient(self, eigenvalues, params=None):
+        """Exact gradient of the expectation value of a diagonal observable.
+
+        Uses the parameter-shift rule: every parameterized gate is a rotation
+        exp(-i theta P / 2), so dE/dtheta = (E(theta + pi/2) - E(theta - pi/2)) / 2.
+        All 2 * num_params shifted parameter sets are evaluated in one batch.
+        The gradient is that of the rotation, so at an angle of exactly zero it
+        ignores the Pauli gate the grid shows there.
+        """
+        if params is None:
+            params = self.params
+        params = np.asarray(params, dtype=np.float64)
+        shifts = np.eye(len(params)) * (np.pi / 2)
+        shifted_params = np.concatenate((params + shifts, params - shifts))
+
+        exp_vals, _ = self.evaluate_batch(shifted_params, eigenvalues, zero_is_pauli=False)
+        return (exp_vals[:len(params)] - exp_vals[len(params):]) / 2
+
+    def _apply_instruction(self, state, instruction, params, zero_is_pauli=True):
+        opcode, target, controls, swap, slot, angle = instruction
+        if opcode == OP_SWAP:
+            apply_swap(state, self.num_qubits, target, swap, controls)
+        elif opcode in ROTATION_OPCODES:
+            if slot != -1:
+                matrix = _param_rotation_matrix(opcode, params[slot], zero_is_pauli)
+            else:
+                matrix = ROTATION_OPCODES[opcode][0](angle)
+            apply_gate(state, self.num_qubits, matrix, target, controls)
+        else:
+            apply_gate(state, self.num_qubits, FIXED_OPCODE_MATRICES[opcode], target, controls)
+
+
+def _param_rotation_matrix(opcode, radians, zero_is_pauli=True):
+    """Matrix for a parameterized rotation, or an (M, 2, 2) stack when radians is an array"""
+    matrix_func, zero_angle_matrix = ROTATION_OPCODES[opcode]
+    if not zero_is_pauli:
+        return matrix_func(radians)
+    if np.ndim(radians) == 0:
+        return zero_angle_matrix if radians == 0 else matrix_func(radians)
+    return np.where((radians == 0)[:, np.newaxis, np.newaxis], zero_angle_matrix, matrix_func(radians))
+
+
+def estimate_memory_bytes(num_qubits, dtype=np.complex128):
+    """Estimate the peak memory used to simulate and evaluate a register of num_qubits, erring high.
+
+    This allows for two gate tapes, the one being displayed and the
+    optimizer's copy, each with its checkpoints, a working statevector and
+    the temporary from applying a gate. Batched evaluation adds a stack of
+    up to BATCH_MEMORY_BUDGET bytes, or one statevector if that is larger,
+    and a temporary of the same size. The display keeps a rounded copy of the
+    statevector, and computes probabilities and indices of the most probable
+    states from it. The float64 eigenvalue diagonal is kept along with the
+    optimizer's copy, and building it needs up to three more while the
+    halves are concatenated.
+    """
+    state_bytes = (2 ** num_qubits) * np.dtype(dtype).itemsize
+    diagonal_bytes = (2 ** num_qubits) * np.dtype(np.float64).itemsize
+    tape_bytes = CHECKPOINT_MEMORY_BUDGET + 2 * state_bytes
+    batch_bytes = 2 * max(BATCH_MEMORY_BUDGET, state_bytes)
+    display_bytes = state_bytes + 3 * diagonal_bytes
+    return 2 * tape_bytes + batch_bytes + display_bytes + 5 * diagonal_bytes
@@ -14,8 +14,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import functools
+
 import pygame
 
+TEXT_CACHE_SIZE = 1024
+
 pygame.font.init()
 ARIAL_48 = pygame.font.SysFont('Arial', 44)
 ARIAL_36 = pygame.font.SysFont('Arial', 30)
@@ -24,3 +28,9 @@ ARIAL_24 = pygame.font.SysFont('Arial', 20)
 ARIAL_22 = pygame.font.SysFont('Arial', 18)
 ARIAL_20 = pygame.font.SysFont('Arial', 16)
 ARIAL_16 = pygame.font.SysFont('Arial', 12)
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(font, text, antialias=False, color=(0, 0, 0), background=None):
+    """Rendered text, shared by every caller that draws the same string, so blit it rather than drawing on it"""
+    return font.render(text, antialias, color, background)
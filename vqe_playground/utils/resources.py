@@ -42,6 +42,22 @@ def load_image(name, colorkey=None):
     return image, image.get_rect()
 
 
+# Surfaces loaded by load_cached_image, keyed by name and colorkey
+_image_cache = {}
+
+
+def load_cached_image(name, colorkey=None):
+    """Like load_image, but each image is only loaded once per process.
+
+    The surface is shared by every caller, so copy it before drawing on it.
+    """
+    key = (name, colorkey)
+    if key not in _image_cache:
+        _image_cache[key], _ = load_image(name, colorkey)
+    image = _image_cache[key]
+    return image, image.get_rect()
+
+
 def load_mem_image(buf, colorkey=None):
     try:
         buf.seek(0)
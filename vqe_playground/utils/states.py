@@ -14,15 +14,44 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-MAX_NUM_QUBITS = 10
-NUM_QUBITS = 5
+import os
+
+import numpy as np
+
+# The number of qubits, the statevector precision and the memory budget
+# may be configured with environment variables
+MAX_NUM_QUBITS = 26
+NUM_QUBITS = int(os.environ.get('VQE_PLAYGROUND_NUM_QUBITS', 5))
 NUM_STATE_DIMS = 2**NUM_QUBITS
+STATEVECTOR_DTYPE = np.dtype(os.environ.get('VQE_PLAYGROUND_DTYPE', 'complex128'))
+MEMORY_BUDGET_BYTES = int(os.environ.get('VQE_PLAYGROUND_MEMORY_BUDGET_MB', 8192)) * 1024 * 1024
+
+# Above this many basis states, only the most probable ones are displayed
+MAX_DISPLAYED_STATES = 32
+
+if not 1 <= NUM_QUBITS <= MAX_NUM_QUBITS:
+    raise ValueError('VQE_PLAYGROUND_NUM_QUBITS must be between 1 and ' + str(MAX_NUM_QUBITS))
+if STATEVECTOR_DTYPE not in (np.complex64, np.complex128):
+    raise ValueError('VQE_PLAYGROUND_DTYPE must be complex64 or complex128')
+
+
+def basis_state_label(idx, num_qubits):
+    return format(idx, '0' + str(num_qubits) + 'b')
+
+
+class BasisStates():
+    """Sequence of computational basis state labels, generated on demand"""
+    def __init__(self, num_qubits):
+        self.num_qubits = num_qubits
+
+    def __len__(self):
+        return 2**self.num_qubits
+
+    def __getitem__(self, idx):
+        if not -len(self) <= idx < len(self):
+            raise IndexError('basis state index out of range')
+        return basis_state_label(idx % len(self), self.num_qubits)
 
 
 def comp_basis_states(num_qubits):
-    num_qb = min(num_qubits, MAX_NUM_QUBITS)
-    basis_states = []
-    for idx in range(2**num_qb):
-        state = format(idx, '0' + str(num_qb) + 'b')
-        basis_states.append(state)
-    return basis_states
+    return BasisStates(min(num_qubits, MAX_NUM_QUBITS))
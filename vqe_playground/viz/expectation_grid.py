@@ -16,17 +16,27 @@
 #
 import pygame
 import numpy as np
-from qiskit import BasicAer, execute
-from qiskit.optimization.applications.ising import max_cut
-from qiskit.aqua.operators.legacy import op_converter as op_c
+from vqe_playground.profiler import profiled
+from vqe_playground.sim.maxcut import maxcut_diagonal, update_maxcut_diagonal
+from vqe_playground.sim.statevector import simulate_circuit
 from vqe_playground.utils.colors import WHITE, BLACK
-from vqe_playground.utils.fonts import ARIAL_30, ARIAL_36
+from vqe_playground.utils.fonts import ARIAL_30, ARIAL_36, render_text
 from vqe_playground.utils.labels import graph_node_labels_reversed_str
-from vqe_playground.utils.states import comp_basis_states, NUM_QUBITS, NUM_STATE_DIMS
+from vqe_playground.utils.states import comp_basis_states, NUM_QUBITS, NUM_STATE_DIMS, MAX_DISPLAYED_STATES
+
+BLOCK_SIZE = 26
+X_OFFSET = 400
+Y_OFFSET = 10
 
 
 class ExpectationGrid(pygame.sprite.Sprite):
-    """Displays a grid that contains basis states, eigenvalues, and probabilities"""
+    """Displays a grid that contains basis states, eigenvalues, and probabilities.
+
+    The labels and eigenvalues are drawn once onto a static layer, which is
+    redrawn only when the adjacency matrix or the displayed basis states
+    change. Each update copies it and draws the probabilities and the
+    values that depend on the statevector over it.
+    """
     def __init__(self, circuit, adj_matrix):
         pygame.sprite.Sprite.__init__(self)
         self.eigenvalues = None
@@ -38,6 +48,9 @@ class ExpectationGrid(pygame.sprite.Sprite):
         self.cur_exp_val = 0
         self.cur_basis_state_idx = 0
         self.basis_state_dirty = False
+        self.static_layer = None
+        self.static_state_indices = None
+        self.lowest_eigenvalue = 0
 
         # When setting circuit this first time,
         # don't calculate the expectation value
@@ -50,74 +63,103 @@ class ExpectationGrid(pygame.sprite.Sprite):
     #     # Nothing yet
     #     a = 1
 
+    @profiled('ExpectationGrid.set_circuit')
     def set_circuit(self, circuit, recalc=True):
-        backend_sv_sim = BasicAer.get_backend('statevector_simulator')
-        job_sim = execute(circuit, backend_sv_sim)
-        result_sim = job_sim.result()
-        self.quantum_state = result_sim.get_statevector(circuit, decimals=3)
+        self.set_statevector(simulate_circuit(circuit), recalc)
+
+    @profiled('ExpectationGrid.set_statevector')
+    def set_statevector(self, statevector, recalc=True):
+        self.quantum_state = np.around(statevector, decimals=3)
 
         if recalc:
             self.calc_expectation_value()
             self.draw_expectation_grid()
 
     def set_adj_matrix(self, adj_matrix):
-        maxcut_op, self.maxcut_shift = max_cut.get_operator(adj_matrix)
-        # print("maxcut_op: ", maxcut_op, ", maxcut_shift: ", maxcut_shift)
-
-        maxcut_to_matrix = op_c.to_matrix_operator(maxcut_op)
-        self.eigenvalues = maxcut_to_matrix.dia_matrix
+        self.eigenvalues, self.maxcut_shift = maxcut_diagonal(adj_matrix)
+        self.static_layer = None
 
         self.calc_expectation_value()
         self.draw_expectation_grid()
 
-    def draw_expectation_grid(self):
-        self.image = pygame.Surface([(NUM_QUBITS + 1) * 50 + 450, 100 + NUM_STATE_DIMS * 50])
-        self.image.convert()
-        self.image.fill(WHITE)
-        self.rect = self.image.get_rect()
+    def update_edge_weight(self, node_a, node_b, delta_weight):
+        """Adjust the eigenvalues for a change in the weight of one edge, without rebuilding them"""
+        self.maxcut_shift = update_maxcut_diagonal(self.eigenvalues, self.maxcut_shift,
+                                                   node_a, node_b, delta_weight)
+        self.static_layer = None
+
+        self.calc_expectation_value()
+        self.draw_expectation_grid()
 
-        block_size = 26
-        x_offset = 400
-        y_offset = 10
+    def displayed_state_indices(self):
+        """Indices of the basis states to display: all of them, or the most probable when there are too many"""
+        if NUM_STATE_DIMS <= MAX_DISPLAYED_STATES:
+            return np.arange(NUM_STATE_DIMS)
 
-        # Display expectation value and other relevant values
-        text_surface = ARIAL_36.render('Weighted average: ' + str(round(self.cur_exp_val, 2)), False, (0, 0, 0))
-        self.image.blit(text_surface, (0, y_offset + block_size * 13))
+        statevector_probs = np.absolute(self.quantum_state) ** 2
+        top_indices = np.argpartition(statevector_probs, -MAX_DISPLAYED_STATES)[-MAX_DISPLAYED_STATES:]
+        return top_indices[np.argsort(-statevector_probs[top_indices])]
 
-        text_surface = ARIAL_36.render('Lowest eigenvalue: ' + str(round(min(self.eigenvalues), 1)), False, (0, 0, 0))
-        self.image.blit(text_surface, (0, y_offset + block_size * 14))
+    def draw_expectation_grid(self):
+        state_indices = self.displayed_state_indices()
+        if self.static_layer is None or not np.array_equal(state_indices, self.static_state_indices):
+            self.draw_static_layer(state_indices)
+
+        if self.image is None or self.image.get_size() != self.static_layer.get_size():
+            self.image = pygame.Surface(self.static_layer.get_size())
+            self.image.convert()
+            # Keep the position the grid was arranged at
+            self.rect = self.image.get_rect(topleft=self.rect.topleft if self.rect else (0, 0))
+        self.image.blit(self.static_layer, (0, 0))
+
+        # Display the values that change with the statevector after their labels
+        maxcut_cost = round(self.cur_exp_val - self.lowest_eigenvalue, 2)
+        self.draw_summary_value(13, 'Weighted average: ', str(round(self.cur_exp_val, 2)))
+        self.draw_summary_value(15, 'Maxcut cost: ', str(maxcut_cost))
+        self.draw_summary_value(16, 'Basis state: ', str(self.basis_states[self.cur_basis_state_idx]))
+        self.draw_summary_value(18, 'Maxcut weight total: ', str(round(self.cur_exp_val + self.maxcut_shift, 2)))
+
+        for y, state_idx in enumerate(state_indices):
+            prop_square_side = float(abs(self.quantum_state[state_idx])) * BLOCK_SIZE
+            rect = pygame.Rect(X_OFFSET + 40 - (prop_square_side / 2) + NUM_QUBITS * 30,
+                               (y + 1) * BLOCK_SIZE + 35 + ((BLOCK_SIZE - prop_square_side) / 2),
+                               prop_square_side,
+                               prop_square_side)
+            if abs(self.quantum_state[state_idx]) > 0:
+                pygame.draw.rect(self.image, BLACK, rect, 2)
 
-        maxcut_cost = round(self.cur_exp_val - min(self.eigenvalues), 2)
-        text_surface = ARIAL_36.render('Maxcut cost: ' + str(maxcut_cost), False, (0, 0, 0))
-        self.image.blit(text_surface, (0, y_offset + block_size * 15))
+    def draw_static_layer(self, state_indices):
+        """Draw the labels and eigenvalues, which only change with the adjacency matrix or displayed states"""
+        self.static_layer = pygame.Surface([(NUM_QUBITS + 1) * 50 + 450, 100 + len(state_indices) * 50])
+        self.static_layer.convert()
+        self.static_layer.fill(WHITE)
+        self.static_state_indices = state_indices
+        self.lowest_eigenvalue = self.eigenvalues.min()
 
-        text_surface = ARIAL_36.render('Basis state: ' + str(self.basis_states[self.cur_basis_state_idx]),
-                                       False, (0, 0, 0))
-        self.image.blit(text_surface, (0, y_offset + block_size * 16))
+        # Display labels of the summary values, and those that only depend on the eigenvalues
+        for row, label in ((13, 'Weighted average: '), (15, 'Maxcut cost: '), (16, 'Basis state: '),
+                           (18, 'Maxcut weight total: ')):
+            self.static_layer.blit(render_text(ARIAL_36, label), (0, Y_OFFSET + BLOCK_SIZE * row))
 
-        text_surface = ARIAL_36.render('Maxcut eigenval shift: ' + str(round(self.maxcut_shift, 1)), False, (0, 0, 0))
-        self.image.blit(text_surface, (0, y_offset + block_size * 17))
+        text_surface = render_text(ARIAL_36, 'Lowest eigenvalue: ' + str(round(self.lowest_eigenvalue, 1)))
+        self.static_layer.blit(text_surface, (0, Y_OFFSET + BLOCK_SIZE * 14))
 
-        text_surface = ARIAL_36.render('Maxcut weight total: ' + str(round(self.cur_exp_val + self.maxcut_shift, 2)), False, (0, 0, 0))
-        self.image.blit(text_surface, (0, y_offset + block_size * 18))
+        text_surface = render_text(ARIAL_36, 'Maxcut eigenval shift: ' + str(round(self.maxcut_shift, 1)))
+        self.static_layer.blit(text_surface, (0, Y_OFFSET + BLOCK_SIZE * 17))
 
         # Display column headings
         node_letter_str = graph_node_labels_reversed_str(NUM_QUBITS)
-        text_surface = ARIAL_30.render(node_letter_str + '  Eigenval  Prob', False, (0, 0, 0))
-        self.image.blit(text_surface, (x_offset, y_offset + block_size / 2))
+        text_surface = render_text(ARIAL_30, node_letter_str + '  Eigenval  Prob')
+        self.static_layer.blit(text_surface, (X_OFFSET, Y_OFFSET + BLOCK_SIZE / 2))
 
-        for y in range(NUM_STATE_DIMS):
-            text_surface = ARIAL_36.render(self.basis_states[y] + ":  " + str(round(self.eigenvalues[y], 1)),
-                                           False, (0, 0, 0))
-            self.image.blit(text_surface, (x_offset, (y + 2) * block_size + y_offset))
+        for y, state_idx in enumerate(state_indices):
+            text_surface = render_text(ARIAL_36, self.basis_states[state_idx] + ":  " +
+                                       str(round(self.eigenvalues[state_idx], 1)))
+            self.static_layer.blit(text_surface, (X_OFFSET, (y + 2) * BLOCK_SIZE + Y_OFFSET))
 
-            prop_square_side = abs(self.quantum_state[y]) * block_size
-            rect = pygame.Rect(x_offset + 40 - (prop_square_side / 2) + NUM_QUBITS * 30,
-                               (y + 1) * block_size + 35 + ((block_size - prop_square_side) / 2),
-                               prop_square_side,
-                               prop_square_side)
-            if abs(self.quantum_state[y]) > 0:
-                pygame.draw.rect(self.image, BLACK, rect, 2)
+    def draw_summary_value(self, row, label, value):
+        x = render_text(ARIAL_36, label).get_width()
+        self.image.blit(render_text(ARIAL_36, value), (x, Y_OFFSET + BLOCK_SIZE * row))
 
     def calc_expectation_value(self):
         statevector_probs = np.absolute(self.quantum_state) ** 2
@@ -15,19 +15,23 @@
 # limitations under the License.
 #
 import pygame
-from qiskit import BasicAer, QuantumRegister, ClassicalRegister, QuantumCircuit, execute
+import numpy as np
 from qiskit.tools.visualization import plot_histogram
 
+from vqe_playground.sim.sampling import measurement_probabilities, sample_counts, counts_dict
+from vqe_playground.sim.statevector import simulate_circuit
 from vqe_playground.utils.resources import load_image
 
 DEFAULT_NUM_SHOTS = 100
 
 class MeasurementsHistogram(pygame.sprite.Sprite):
     """Displays a histogram with measurements"""
-    def __init__(self, circuit, num_shots=DEFAULT_NUM_SHOTS):
+    def __init__(self, circuit, num_shots=DEFAULT_NUM_SHOTS, seed=None):
         pygame.sprite.Sprite.__init__(self)
         self.image = None
         self.rect = None
+        self.rng = np.random.default_rng(seed)
+        self.counts = None
         self.set_circuit(circuit, num_shots)
 
     # def update(self):
@@ -35,22 +39,15 @@ class MeasurementsHistogram(pygame.sprite.Sprite):
     #     a = 1
 
     def set_circuit(self, circuit, num_shots=DEFAULT_NUM_SHOTS):
-        backend_sim = BasicAer.get_backend('qasm_simulator')
-        qr = QuantumRegister(circuit.width(), 'q')
-        cr = ClassicalRegister(circuit.width(), 'c')
-        meas_circ = QuantumCircuit(qr, cr)
-        meas_circ.barrier(qr)
-        meas_circ.measure(qr, cr)
-        complete_circuit = circuit + meas_circ
+        self.set_statevector(simulate_circuit(circuit), num_shots)
 
-        job_sim = execute(complete_circuit, backend_sim, shots=num_shots)
+    def set_statevector(self, statevector, num_shots=DEFAULT_NUM_SHOTS):
+        """Sample measurements of every qubit directly from the statevector probabilities"""
+        num_qubits = len(statevector).bit_length() - 1
+        counts = sample_counts(measurement_probabilities(statevector), num_shots, self.rng)
+        self.counts = counts_dict(counts, num_qubits)
 
-        result_sim = job_sim.result()
-
-        counts = result_sim.get_counts(complete_circuit)
-        print(counts)
-
-        histogram = plot_histogram(counts)
+        histogram = plot_histogram(self.counts)
         histogram.savefig("vqe_playground/utils/data/bell_histogram.png")
 
         self.image, self.rect = load_image('bell_histogram.png', -1)
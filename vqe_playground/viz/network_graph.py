@@ -14,40 +14,76 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import collections
+
 import pygame
 import numpy as np
-import matplotlib.pyplot as plt
 import networkx as nx
 from cmath import isclose
-import io
 
-from vqe_playground.utils.resources import load_mem_image
+from vqe_playground.profiler import profiled
+from vqe_playground.utils.colors import WHITE, BLACK, RED, BLUE
+from vqe_playground.utils.fonts import ARIAL_24, ARIAL_30, render_text
 from vqe_playground.utils.labels import comp_graph_node_labels
 
+GRAPH_WIDTH = 700
+GRAPH_HEIGHT = 500
+
+# Region of the image that node centers are placed in, matching where
+# matplotlib puts its axes in a 7x5 inch figure
+PLOT_AREA = pygame.Rect(105, 80, 505, 345)
+
+NODE_RADIUS = 20
+EDGE_WIDTH = 2
+
+# Colors for the two sides of the cut
+NODE_COLORS = RED, BLUE
+
+RENDERERS = 'pygame', 'matplotlib'
+
+# Layouts are seeded so that a graph is always laid out the same way. After
+# an edge is added or removed, the layout continues from the previous
+# positions, which needs fewer iterations than starting over.
+LAYOUT_SEED = 42
+LAYOUT_ITERATIONS = 50
+WARM_START_ITERATIONS = 20
+LAYOUT_CACHE_SIZE = 128
+
 
 class NetworkGraph(pygame.sprite.Sprite):
-    """Displays a network graph"""
-    def __init__(self, adj_matrix):
+    """Displays a network graph.
+
+    The graph is drawn directly with pygame, or with networkx and matplotlib
+    when renderer is 'matplotlib'. Both use the layout computed when the
+    adjacency matrix is set. Layouts are cached by which edges are present,
+    so the nodes return to the same places when an edit is undone.
+    """
+    def __init__(self, adj_matrix, renderer='pygame'):
         pygame.sprite.Sprite.__init__(self)
+        if renderer not in RENDERERS:
+            raise ValueError('renderer must be one of ' + ', '.join(RENDERERS))
+        self.renderer = renderer
         self.image = None
         self.rect = None
         self.adj_matrix = None
         self.solution = None
         self.graph = nx.Graph()
         self.graph_pos = None
+        self.layout_cache = collections.OrderedDict()
+        self.figure = None
+        self.axes = None
         self.num_nodes = adj_matrix.shape[0] # Number of nodes in graph
+        self.node_labels = comp_graph_node_labels(self.num_nodes)
         self.set_adj_matrix(adj_matrix)
 
     def update(self):
-        self.draw_network_graph(self.calc_node_colors())
+        self.draw_network_graph()
 
     def set_adj_matrix(self, adj_matrix):
         self.graph = nx.Graph()
         self.adj_matrix = adj_matrix
         self.solution = np.zeros(self.num_nodes)
 
-        fig = plt.figure(figsize=(7, 5))
-
         self.graph.add_nodes_from(np.arange(0, self.num_nodes, 1))
 
         # tuple is (i,j,weight) where (i,j) is the edge
@@ -59,29 +95,111 @@ class NetworkGraph(pygame.sprite.Sprite):
 
         self.graph.add_weighted_edges_from(edge_list)
 
-        self.graph_pos = nx.spring_layout(self.graph)
-        self.draw_network_graph(self.calc_node_colors())
+        self.graph_pos = self.calc_layout()
+        self.draw_network_graph()
 
-    def set_solution(self, solution):
-        self.solution = solution
+    def calc_layout(self):
+        """Node positions for the current graph, from the cache if it has been laid out before"""
+        topology = tuple(sorted(self.graph.edges()))
+        if topology in self.layout_cache:
+            self.layout_cache.move_to_end(topology)
+            return self.layout_cache[topology]
 
-        self.draw_network_graph(self.calc_node_colors())
+        if self.graph_pos is None:
+            graph_pos = nx.spring_layout(self.graph, iterations=LAYOUT_ITERATIONS, seed=LAYOUT_SEED)
+        else:
+            graph_pos = nx.spring_layout(self.graph, pos=self.graph_pos, iterations=WARM_START_ITERATIONS,
+                                         seed=LAYOUT_SEED)
 
-    def draw_network_graph(self, colors):
-        edge_labels = dict([((u, v,), self.adj_matrix[u, v]) for u, v, d in self.graph.edges(data=True)])
-        nx.draw_networkx_edge_labels(self.graph, self.graph_pos, edge_labels=edge_labels)
+        self.layout_cache[topology] = graph_pos
+        if len(self.layout_cache) > LAYOUT_CACHE_SIZE:
+            self.layout_cache.popitem(last=False)
+        return graph_pos
 
-        labels = comp_graph_node_labels(self.num_nodes)
-        nx.draw_networkx_labels(self.graph, self.graph_pos, labels, font_size=16, font_color='white')
+    def set_solution(self, solution):
+        self.solution = solution
 
-        nx.draw_networkx(self.graph, self.graph_pos, with_labels=False, node_color=colors, node_size=600, alpha=.8, font_color='white')
-        plt.axis('off')
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png")
+        self.draw_network_graph()
+
+    @profiled('NetworkGraph.draw_network_graph')
+    def draw_network_graph(self):
+        # Keep the position the graph was arranged at
+        topleft = self.rect.topleft if self.rect else (0, 0)
+        if self.renderer == 'matplotlib':
+            self.draw_network_graph_matplotlib(self.calc_node_colors())
+        else:
+            self.draw_network_graph_pygame()
+        self.rect.topleft = topleft
+
+    def draw_network_graph_pygame(self):
+        if self.image is None:
+            self.image = pygame.Surface([GRAPH_WIDTH, GRAPH_HEIGHT])
+            self.image.convert()
+            self.image.set_colorkey(WHITE)
+            self.rect = self.image.get_rect()
+        self.image.fill(WHITE)
+
+        node_centers = self.calc_node_centers()
+
+        for u, v in self.graph.edges():
+            pygame.draw.line(self.image, BLACK, node_centers[u], node_centers[v], EDGE_WIDTH)
+
+        for u, v in self.graph.edges():
+            # Weight in a white box halfway along the edge
+            text_surface = render_text(ARIAL_24, str(self.adj_matrix[u, v]), True, BLACK, WHITE)
+            midpoint = (node_centers[u] + node_centers[v]) / 2
+            self.image.blit(text_surface, text_surface.get_rect(center=tuple(midpoint)))
+
+        for node, side in enumerate(self.calc_node_sides()):
+            center = tuple(node_centers[node])
+            pygame.draw.circle(self.image, NODE_COLORS[side], center, NODE_RADIUS)
+            text_surface = render_text(ARIAL_30, self.node_labels[node], True, WHITE)
+            self.image.blit(text_surface, text_surface.get_rect(center=center))
+
+    def draw_network_graph_matplotlib(self, colors):
+        if self.figure is None:
+            # Imported here so that matplotlib is only needed by its renderer. The figure
+            # is created without pyplot, so pyplot doesn't keep it alive after this graph.
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.figure = Figure(figsize=(7, 5))
+            FigureCanvasAgg(self.figure)
+            self.axes = self.figure.add_subplot()
+        self.axes.clear()
 
-        self.image, self.rect = load_mem_image(buf, -1)
-        self.image.convert()
+        edge_labels = dict([((u, v,), self.adj_matrix[u, v]) for u, v, d in self.graph.edges(data=True)])
+        nx.draw_networkx_edge_labels(self.graph, self.graph_pos, edge_labels=edge_labels, ax=self.axes)
+
+        nx.draw_networkx_labels(self.graph, self.graph_pos, self.node_labels, font_size=16, font_color='white',
+                                ax=self.axes)
+
+        nx.draw_networkx(self.graph, self.graph_pos, with_labels=False, node_color=colors, node_size=600, alpha=.8,
+                         font_color='white', ax=self.axes)
+        self.axes.axis('off')
+
+        # Copy the pixels straight from the canvas rather than through a PNG
+        canvas = self.figure.canvas
+        canvas.draw()
+        self.image = pygame.image.frombuffer(canvas.buffer_rgba(), canvas.get_width_height(), 'RGBA').convert()
+        self.image.set_colorkey(self.image.get_at((0, 0)), pygame.RLEACCEL)
+        self.rect = self.image.get_rect()
+
+    def calc_node_centers(self):
+        """Pixel coordinates of each node, scaling the layout to fill the plot area"""
+        positions = np.array([self.graph_pos[node] for node in range(self.num_nodes)], dtype=float)
+        low = positions.min(axis=0)
+        span = positions.max(axis=0) - low
+        span[span == 0] = 1
+        scaled = (positions - low) / span
+        if self.num_nodes == 1:
+            scaled[:] = 0.5
+
+        # Flip y, as the layout's y axis points up and the image's points down
+        return np.column_stack((PLOT_AREA.left + scaled[:, 0] * PLOT_AREA.width,
+                                PLOT_AREA.bottom - scaled[:, 1] * PLOT_AREA.height))
+
+    def calc_node_sides(self):
+        return [0 if self.solution[self.num_nodes - i - 1] == 0 else 1 for i in range(self.num_nodes)]
 
     def calc_node_colors(self):
-        return ['r' if self.solution[self.num_nodes - i - 1] == 0 else 'b' for i in range(self.num_nodes)]
-
+        return ['r' if side == 0 else 'b' for side in self.calc_node_sides()]
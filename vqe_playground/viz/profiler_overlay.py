@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#
+# Copyright 2019 the original author or authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import pygame
+
+from vqe_playground.profiler import PERCENTILES
+from vqe_playground.utils.colors import BLACK, LIGHT_GREY
+from vqe_playground.utils.fonts import ARIAL_20
+
+# Redrawing the table every frame would show up in its own timings
+REFRESH_INTERVAL_MS = 500
+
+ROW_HEIGHT = 20
+MARGIN = 8
+STAGE_COLUMN_WIDTH = 280
+NUMBER_COLUMN_WIDTH = 70
+
+COLUMN_HEADINGS = ['stage', 'count', 'mean'] + ['p' + str(percentile) for percentile in PERCENTILES] + ['max']
+
+
+class ProfilerOverlay(pygame.sprite.Sprite):
+    """Displays a table of the timings collected by a Profiler, in milliseconds.
+
+    While hidden its image is empty, so that the panels under it are shown.
+    """
+    def __init__(self, profiler, x, y):
+        pygame.sprite.Sprite.__init__(self)
+        self.profiler = profiler
+        self.visible = False
+        self.last_drawn_ticks = 0
+        self.image = None
+        self.rect = None
+        self.xpos = x
+        self.ypos = y
+        self.draw_overlay()
+
+    def update(self):
+        """Redraw the table if it is visible and hasn't been redrawn recently, returning whether it was"""
+        if self.visible and pygame.time.get_ticks() - self.last_drawn_ticks >= REFRESH_INTERVAL_MS:
+            self.draw_overlay()
+            return True
+        return False
+
+    def set_visible(self, visible):
+        self.visible = visible
+        self.draw_overlay()
+
+    def draw_overlay(self):
+        if not self.visible:
+            self.image = pygame.Surface([0, 0])
+            self.rect = self.image.get_rect(topleft=(self.xpos, self.ypos))
+            return
+
+        rows = [COLUMN_HEADINGS]
+        for stage_stats in self.profiler.stats():
+            rows.append([stage_stats.stage, str(stage_stats.count)] +
+                        ['%.2f' % value for value in (stage_stats.mean, *stage_stats.percentiles, stage_stats.max)])
+
+        width = STAGE_COLUMN_WIDTH + (len(COLUMN_HEADINGS) - 1) * NUMBER_COLUMN_WIDTH + 2 * MARGIN
+        self.image = pygame.Surface([width, len(rows) * ROW_HEIGHT + 2 * MARGIN])
+        self.image.convert()
+        self.image.fill(LIGHT_GREY)
+        pygame.draw.rect(self.image, BLACK, self.image.get_rect(), 1)
+
+        for row_num, row in enumerate(rows):
+            y = MARGIN + row_num * ROW_HEIGHT
+            self.image.blit(ARIAL_20.render(row[0], False, BLACK), (MARGIN, y))
+            for column_num, text in enumerate(row[1:]):
+                # Right-align the numbers in their columns
+                text_surface = ARIAL_20.render(text, False, BLACK)
+                x = MARGIN + STAGE_COLUMN_WIDTH + (column_num + 1) * NUMBER_COLUMN_WIDTH - text_surface.get_width()
+                self.image.blit(text_surface, (x, y))
+
+        self.rect = self.image.get_rect(topleft=(self.xpos, self.ypos))
+        self.last_drawn_ticks = pygame.time.get_ticks()
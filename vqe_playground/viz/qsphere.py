@@ -15,9 +15,10 @@
 # limitations under the License.
 #
 import pygame
-from qiskit import BasicAer, execute
+import numpy as np
 from qiskit.tools.visualization import plot_state_qsphere
 
+from vqe_playground.sim.statevector import simulate_circuit
 from vqe_playground.utils.resources import load_image
 
 
@@ -34,11 +35,7 @@ class QSphere(pygame.sprite.Sprite):
     #     a = 1
 
     def set_circuit(self, circuit):
-        backend_sv_sim = BasicAer.get_backend('statevector_simulator')
-        job_sim = execute(circuit, backend_sv_sim)
-        result_sim = job_sim.result()
-
-        quantum_state = result_sim.get_statevector(circuit, decimals=3)
+        quantum_state = np.around(simulate_circuit(circuit), decimals=3)
         qsphere = plot_state_qsphere(quantum_state)
         qsphere.savefig("vqe_playground/utils/data/bell_qsphere.png")
 
@@ -32,27 +32,61 @@
 #
 """Demonstrate Variational Quantum Eigensolver (VQE) concepts using Qiskit and Pygame"""
 
+import os
+import time
+
 from pygame.locals import *
-from qiskit import ClassicalRegister
-from qiskit import execute
 # from qiskit.optimization.applications.ising import max_cut
 from .containers import *
 from .controls.circuit_grid import *
 from .model.circuit_grid_model import *
 from .utils.gamepad import *
-from .utils.states import NUM_QUBITS, NUM_STATE_DIMS
+from .model.ansatz import create_ansatz_model
+from .optimization import OPTIMIZERS, BackgroundOptimizer, MultiStartOptimizer, initial_rotations_for_start
+from .profiler import PROFILER, profiled
+from .replay import EventRecorder, EventReplay
+from .sim.tape import estimate_memory_bytes
+from .utils.states import NUM_QUBITS, STATEVECTOR_DTYPE, MEMORY_BUDGET_BYTES
 from .viz.expectation_grid import ExpectationGrid
 from .viz.network_graph import NetworkGraph
+from .viz.profiler_overlay import ProfilerOverlay
 from .controls.adjacency_matrix import AdjacencyMatrix
 from .controls.button import Button
 
 WINDOW_SIZE = 1650, 950
-NUM_OPTIMIZATION_EPOCHS = 1
+
+# One of the names in optimization.OPTIMIZERS
+OPTIMIZER_NAME = os.environ.get('VQE_PLAYGROUND_OPTIMIZER', 'coordinate')
+
+# Either 'pygame' or 'matplotlib'
+GRAPH_RENDERER = os.environ.get('VQE_PLAYGROUND_GRAPH_RENDERER', 'pygame')
+
+
+def create_initial_adj_matrix(num_nodes):
+    if num_nodes == 5:
+        return np.array([
+            [0, 3, 1, 3, 0],
+            [3, 0, 0, 0, 2],
+            [1, 0, 0, 3, 0],
+            [3, 0, 3, 0, 2],
+            [0, 2, 0, 2, 0]
+        ])
+
+    # Otherwise start with a ring, which has an obvious maximum cut
+    ring = np.roll(np.eye(num_nodes, dtype=int), 1, axis=1)
+    adj_matrix = np.minimum(ring + ring.T, 1)
+    np.fill_diagonal(adj_matrix, 0)
+    return adj_matrix
 
 
 class VQEPlayground():
-    """Main object for application"""
-    def __init__(self):
+    """Main object for application.
+
+    Input events may be recorded to record_path, or replayed from replay_path
+    with the latency of each type of event reported when the replay ends, and
+    written to latency_csv_path if it is given.
+    """
+    def __init__(self, record_path=None, replay_path=None, latency_csv_path=None):
         self.screen = pygame.display.set_mode(WINDOW_SIZE)
         self.background = pygame.Surface(self.screen.get_size())
         self.circuit_grid_model = None
@@ -63,27 +97,55 @@ class VQEPlayground():
         self.network_graph = None
         self.adjacency_matrix = None
         self.optimize_button = None
+        self.profiler_overlay = None
         self.circ_viz_dirty = False
 
-        # Optimization state variables, so that the display can update while
-        # the optimizing algorithm is running
-        self.optimization_desired = False
-        self.optimization_initialized = False
-        self.optimized_rotations = None
-        self.cur_optimization_epoch = 0
-        self.cur_rotation_num = 0
-        self.min_distance = None
-        self.rotation_initialized = False
-        self.finished_rotating = True
-        self.rotation_iterations = 0
-        self.proposed_cur_ang_rad = 0
-        self.cur_ang_rad = 0
-        self.frequent_viz_update = True
+        # Version of the circuit last simulated for the expectation grid
+        self.circ_viz_version = None
+
+        # Panels in the order they are drawn, and the ones whose regions of the
+        # screen need redrawing
+        self.panels = []
+        self.dirty_panels = set()
+        self.panel_rects = {}
+
+        # Sizes of the sprites in each container when it was last arranged, so
+        # that it is only arranged again when one of them changes size
+        self.arranged_sizes = {}
+
+        # Runs the optimizer on a worker thread, so that the display can update
+        # while it runs
+        self.background_optimizer = None
+
+        # Structure version of the circuit being optimized, as the optimizer's
+        # angles only fit the rotation gates the circuit had when it started
+        self.optimization_structure_version = None
+
+        # Runs independent optimizations in other processes when multi-start is requested
+        self.multistart_optimizer = None
+
+        self.record_path = record_path
+        self.replay_path = replay_path
+        self.latency_csv_path = latency_csv_path
+        self.event_recorder = None
+        self.event_replay = None
 
     def main(self):
         if not pygame.font: print('Warning, fonts disabled')
         if not pygame.mixer: print('Warning, sound disabled')
 
+        memory_bytes = estimate_memory_bytes(NUM_QUBITS, STATEVECTOR_DTYPE)
+        if memory_bytes > MEMORY_BUDGET_BYTES:
+            raise SystemExit('Simulating ' + str(NUM_QUBITS) + ' qubits needs about ' +
+                             str(memory_bytes // 2**20) + ' MB, over the budget of ' +
+                             str(MEMORY_BUDGET_BYTES // 2**20) + ' MB')
+        if OPTIMIZER_NAME not in OPTIMIZERS:
+            raise SystemExit('VQE_PLAYGROUND_OPTIMIZER must be one of ' + ', '.join(OPTIMIZERS))
+        if self.replay_path:
+            self.event_replay = EventReplay(self.replay_path, NUM_QUBITS)
+        if self.record_path:
+            self.event_recorder = EventRecorder(self.record_path, NUM_QUBITS)
+
         pygame.init()
 
         pygame.joystick.init()
@@ -100,8 +162,6 @@ class VQEPlayground():
 
         pygame.font.init()
 
-        self.circuit_grid_model = CircuitGridModel(NUM_QUBITS, 21)
-
         pygame.display.set_caption('VQE Playground')
 
         self.screen.blit(self.background, (0, 0))
@@ -110,65 +170,11 @@ class VQEPlayground():
         # Prepare objects
         clock = pygame.time.Clock()
 
-        self.circuit_grid_model.set_node(0, 0, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(1, 0, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(2, 0, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(3, 0, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(4, 0, CircuitGridNode(node_types.Y, np.pi))
-
-        self.circuit_grid_model.set_node(1, 1, CircuitGridNode(node_types.X, 0, 0))
-        self.circuit_grid_model.set_node(2, 2, CircuitGridNode(node_types.X, 0, 1))
-        self.circuit_grid_model.set_node(3, 3, CircuitGridNode(node_types.X, 0, 2))
-        self.circuit_grid_model.set_node(4, 4, CircuitGridNode(node_types.X, 0, 3))
-
-        self.circuit_grid_model.set_node(0, 5, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(1, 5, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(2, 5, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(3, 5, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(4, 5, CircuitGridNode(node_types.Y, np.pi))
-
-        self.circuit_grid_model.set_node(1, 6, CircuitGridNode(node_types.X, 0, 0))
-        self.circuit_grid_model.set_node(2, 7, CircuitGridNode(node_types.X, 0, 1))
-        self.circuit_grid_model.set_node(3, 8, CircuitGridNode(node_types.X, 0, 2))
-        self.circuit_grid_model.set_node(4, 9, CircuitGridNode(node_types.X, 0, 3))
-
-        self.circuit_grid_model.set_node(0, 10, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(1, 10, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(2, 10, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(3, 10, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(4, 10, CircuitGridNode(node_types.Y, np.pi))
-
-        self.circuit_grid_model.set_node(1, 11, CircuitGridNode(node_types.X, 0, 0))
-        self.circuit_grid_model.set_node(2, 12, CircuitGridNode(node_types.X, 0, 1))
-        self.circuit_grid_model.set_node(3, 13, CircuitGridNode(node_types.X, 0, 2))
-        self.circuit_grid_model.set_node(4, 14, CircuitGridNode(node_types.X, 0, 3))
-
-        self.circuit_grid_model.set_node(0, 15, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(1, 15, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(2, 15, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(3, 15, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(4, 15, CircuitGridNode(node_types.Y, np.pi))
-
-        self.circuit_grid_model.set_node(1, 16, CircuitGridNode(node_types.X, 0, 0))
-        self.circuit_grid_model.set_node(2, 17, CircuitGridNode(node_types.X, 0, 1))
-        self.circuit_grid_model.set_node(3, 18, CircuitGridNode(node_types.X, 0, 2))
-        self.circuit_grid_model.set_node(4, 19, CircuitGridNode(node_types.X, 0, 3))
-
-        self.circuit_grid_model.set_node(0, 20, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(1, 20, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(2, 20, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(3, 20, CircuitGridNode(node_types.Y, np.pi))
-        self.circuit_grid_model.set_node(4, 20, CircuitGridNode(node_types.Y, np.pi))
+        self.circuit_grid_model = create_ansatz_model(NUM_QUBITS, dtype=STATEVECTOR_DTYPE)
 
         circuit = self.circuit_grid_model.compute_circuit()
 
-        initial_adj_matrix = np.array([
-            [0, 3, 1, 3, 0],
-            [3, 0, 0, 0, 2],
-            [1, 0, 0, 3, 0],
-            [3, 0, 3, 0, 2],
-            [0, 2, 0, 2, 0]
-        ])
+        initial_adj_matrix = create_initial_adj_matrix(NUM_QUBITS)
 
         # maxcut_op, maxcut_shift = maxcut.get_maxcut_qubitops(initial_adj_matrix)
         # # print("maxcut_op: ", maxcut_op, ", maxcut_shift: ", maxcut_shift)
@@ -181,13 +187,20 @@ class VQEPlayground():
         self.expectation_grid = ExpectationGrid(circuit,
                                                 self.adjacency_matrix.adj_matrix_numeric)
 
-        self.network_graph = NetworkGraph(self.adjacency_matrix.adj_matrix_numeric)
+        self.network_graph = NetworkGraph(self.adjacency_matrix.adj_matrix_numeric, GRAPH_RENDERER)
         self.optimize_button = Button("Optimize", 150, 40)
 
         self.top_sprites = HBox(50, 20, self.network_graph, self.optimize_button)
         self.right_sprites = VBox(1010, 0, self.expectation_grid)
 
         self.circuit_grid = CircuitGrid(10, 540, self.circuit_grid_model)
+
+        # Shown on top of the other panels when toggled with F1
+        self.profiler_overlay = ProfilerOverlay(PROFILER, 10, 10)
+        self.panels = [self.network_graph, self.optimize_button, self.expectation_grid,
+                       self.adjacency_matrix, self.circuit_grid, self.profiler_overlay]
+        for container in (self.top_sprites, self.right_sprites, self.adjacency_matrix):
+            self.arranged_sizes[container] = [sprite.rect.size for sprite in container.sprites()]
         self.screen.blit(self.background, (0, 0))
 
         self.top_sprites.draw(self.screen)
@@ -201,12 +214,18 @@ class VQEPlayground():
         gamepad_pressed_timer = 0
         gamepad_last_update = pygame.time.get_ticks()
 
+        if self.event_recorder:
+            self.event_recorder.start()
+        if self.event_replay:
+            self.event_replay.start()
+
         # Main Loop
         going = True
         while going:
             clock.tick(30)
 
             pygame.time.wait(10)
+            frame_start = PROFILER.start()
 
             if joystick:
                 gamepad_move = False
@@ -240,12 +259,21 @@ class VQEPlayground():
                 # left_thumb_y = joystick.get_axis(1)
 
             # Handle Input Events
-            for event in pygame.event.get():
+            input_start = PROFILER.start()
+            events = pygame.event.get()
+            if self.event_replay:
+                events += self.event_replay.due_events()
+            if self.event_recorder:
+                self.event_recorder.record(events)
+
+            for event in events:
                 pygame.event.pump()
 
                 # if event.type != MOUSEMOTION:
                 #     print("event: ", event)
                 if event.type == QUIT:
+                    self.stop_optimization()
+                    self.finish_event_session()
                     pygame.quit()
                     print("Quitting VQE Playground")
                     return
@@ -254,16 +282,23 @@ class VQEPlayground():
                 elif event.type == MOUSEBUTTONDOWN:
                     if self.optimize_button.rect.collidepoint(event.pos):
                         if self.optimize_button.get_enabled():
-                            self.optimize_button.set_enabled(False)
-                            self.optimization_desired = True
+                            self.set_optimize_button_enabled(False)
+                            self.start_optimization()
                     else:
                         for idx, picker in enumerate(self.adjacency_matrix.number_pickers_list):
                             if picker.rect.collidepoint(event.pos):
-                                self.adjacency_matrix.handle_element_clicked(picker)
-                                self.expectation_grid.set_adj_matrix(self.adjacency_matrix.adj_matrix_numeric)
+                                edge_edit = self.adjacency_matrix.handle_element_clicked(picker)
+                                if edge_edit is not None:
+                                    self.expectation_grid.update_edge_weight(*edge_edit)
+                                    if self.background_optimizer or self.multistart_optimizer:
+                                        # The optimizer is minimizing the cost of the graph before the edit
+                                        print("Graph changed, stopping optimization")
+                                        self.stop_optimization()
                                 self.circ_viz_dirty = True
+                                self.dirty_panels.add(self.adjacency_matrix)
                                 if self.adjacency_matrix.adj_matrix_graph_dirty:
                                     self.network_graph.set_adj_matrix(self.adjacency_matrix.adj_matrix_numeric)
+                                    self.dirty_panels.add(self.network_graph)
                                     self.adjacency_matrix.adj_matrix_graph_dirty = False
                                     self.expectation_grid.basis_state_dirty = True
 
@@ -295,16 +330,17 @@ class VQEPlayground():
 
                 elif event.type == JOYAXISMOTION:
                     # print("event: ", event)
-                    if event.axis == AXIS_RIGHT_THUMB_X and joystick.get_axis(AXIS_RIGHT_THUMB_X) >= 0.95:
+                    # The event's value is the position of its axis, so replayed events work without a joystick
+                    if event.axis == AXIS_RIGHT_THUMB_X and event.value >= 0.95:
                         self.circuit_grid.handle_input_rotate(np.pi / 8)
                         self.circ_viz_dirty = True
-                    if event.axis == AXIS_RIGHT_THUMB_X and joystick.get_axis(AXIS_RIGHT_THUMB_X) <= -0.95:
+                    if event.axis == AXIS_RIGHT_THUMB_X and event.value <= -0.95:
                         self.circuit_grid.handle_input_rotate(-np.pi / 8)
                         self.circ_viz_dirty = True
-                    if event.axis == AXIS_RIGHT_THUMB_Y and joystick.get_axis(AXIS_RIGHT_THUMB_Y) <= -0.95:
+                    if event.axis == AXIS_RIGHT_THUMB_Y and event.value <= -0.95:
                         self.circuit_grid.handle_input_move_ctrl(MOVE_UP)
                         self.circ_viz_dirty = True
-                    if event.axis == AXIS_RIGHT_THUMB_Y and joystick.get_axis(AXIS_RIGHT_THUMB_Y) >= 0.95:
+                    if event.axis == AXIS_RIGHT_THUMB_Y and event.value >= 0.95:
                         self.circuit_grid.handle_input_move_ctrl(MOVE_DOWN)
                         self.circ_viz_dirty = True
 
@@ -357,59 +393,70 @@ class VQEPlayground():
                         self.circ_viz_dirty = True
                     elif event.key == K_o:
                         if self.optimize_button.get_enabled():
-                            self.optimize_button.set_enabled(False)
-                            self.optimization_desired = True
-
-            if self.optimization_desired:
-                if self.cur_optimization_epoch < NUM_OPTIMIZATION_EPOCHS:
-                    if not self.optimization_initialized:
-                        self.expectation_grid.draw_expectation_grid()
-                        rotation_gate_nodes = self.circuit_grid_model.get_rotation_gate_nodes()
-
-                        self.optimized_rotations = np.full(len(rotation_gate_nodes), np.pi)
-                        self.cur_optimization_epoch = 0
-                        self.cur_rotation_num = 0
-
-                        rotation_bounds = np.zeros((len(rotation_gate_nodes), 2))
-
-                        self.optimization_initialized = True
-
-                    self.optimize_rotations(self.expectation_value_objective_function,
-                                            self.circuit_grid, self.expectation_grid, rotation_gate_nodes)
-
-                    # print('opt_rotations: ', self.optimized_rotations)
+                            self.set_optimize_button_enabled(False)
+                            self.start_optimization()
+                    elif event.key == K_m:
+                        # Optimize from many starting points at once
+                        if self.optimize_button.get_enabled():
+                            self.set_optimize_button_enabled(False)
+                            self.start_multistart_optimization()
+                    elif event.key == K_F1:
+                        # Show or hide the timings of each stage of a frame
+                        self.toggle_profiler()
+                    elif event.key == K_F2:
+                        self.write_profile()
+            PROFILER.stop('input', input_start)
+
+            optimizer_start = PROFILER.start()
+            if (self.background_optimizer or self.multistart_optimizer) and \
+                    self.circuit_grid_model.structure_version != self.optimization_structure_version:
+                print("Circuit changed, stopping optimization")
+                self.stop_optimization()
+
+            if self.multistart_optimizer:
+                best_result = self.multistart_optimizer.poll()
+                if best_result:
+                    print('cost: ', best_result.cost, 'from start: ', best_result.start_num)
+                    self.apply_rotations(best_result.rotations)
+                    self.circ_viz_dirty = True
+                if self.multistart_optimizer.done():
+                    self.multistart_optimizer.shutdown()
+                    self.multistart_optimizer = None
+                    self.set_optimize_button_enabled(True)
+                    print("Finished")
 
-                    cost, basis_state_str = self.expectation_grid.calc_expectation_value()
-                    print('cost: ', cost, 'basis_state_str: ', basis_state_str)
+            if self.background_optimizer:
+                snapshot = self.background_optimizer.latest_snapshot()
+                if snapshot:
+                    self.apply_rotations(snapshot.rotations)
 
-                    solution = np.zeros(NUM_STATE_DIMS)
-                    for idx, char in enumerate(basis_state_str):
-                        solution[idx] = int(char)
+                    if snapshot.cur_rotation_num is not None:
+                        # Highlight gate being operated on
+                        rotation_gate_node = self.circuit_grid_model.get_rotation_gate_nodes()[snapshot.cur_rotation_num]
+                        self.circuit_grid.highlight_selected_node(rotation_gate_node.wire_num,
+                                                                  rotation_gate_node.column_num)
 
-                    # TODO: Uncomment to update display more often?
-                    # self.network_graph.set_solution(solution)
+                    print('cost: ', snapshot.cost, 'evaluations: ', snapshot.num_evaluations)
+                    self.circ_viz_dirty = True
 
-                else:
-                    self.optimization_initialized = False
-                    self.optimization_desired = False
-                    self.cur_optimization_epoch = 0
-                    self.optimize_button.set_enabled(True)
+                    if snapshot.done:
+                        self.background_optimizer = None
+                        self.set_optimize_button_enabled(True)
 
-                    # Select top-left node in circuit, regardless of gate type
-                    self.circuit_grid.highlight_selected_node(0, 0)
-
-                    self.circ_viz_dirty = True
-                    print("Finished")
-                    # self.network_graph.set_solution(solution)
+                        # Select top-left node in circuit, regardless of gate type
+                        self.circuit_grid.highlight_selected_node(0, 0)
+                        print("Finished")
+            PROFILER.stop('optimizer progress', optimizer_start)
 
             if self.expectation_grid.basis_state_dirty:
                 cost, basis_state_str = self.expectation_grid.calc_expectation_value()
 
-                solution = np.zeros(NUM_STATE_DIMS)
+                solution = np.zeros(NUM_QUBITS)
                 for idx, char in enumerate(basis_state_str):
                     solution[idx] = int(char)
 
                 self.network_graph.set_solution(solution)
+                self.dirty_panels.add(self.network_graph)
 
                 self.circ_viz_dirty = True
                 self.expectation_grid.basis_state_dirty = False
@@ -418,122 +465,139 @@ class VQEPlayground():
                 self.update_circ_viz()
                 self.circ_viz_dirty = False
 
-        pygame.quit()
-
-    def optimize_rotations(self, objective_function, circuit_grid, expectation_grid, rotation_gate_nodes):
-
-        move_radians = np.pi / 8
+            if self.profiler_overlay.update():
+                self.dirty_panels.add(self.profiler_overlay)
 
-        self.min_distance = objective_function(circuit_grid, expectation_grid, rotation_gate_nodes)
+            if self.dirty_panels:
+                self.redraw_dirty_panels()
+            if self.event_replay:
+                self.event_replay.frame_presented()
+            PROFILER.stop('frame', frame_start)
 
-        # print('self.cur_optimization_epoch: ', self.cur_optimization_epoch)
-        # print('self.cur_rotation_num: ', self.cur_rotation_num)
-        if self.cur_optimization_epoch < NUM_OPTIMIZATION_EPOCHS:
-            if self.cur_rotation_num < len(self.optimized_rotations):
-                if not self.rotation_initialized:
-                    self.cur_ang_rad = self.optimized_rotations[self.cur_rotation_num]
-                    self.proposed_cur_ang_rad = self.cur_ang_rad
-                    # For each rotation this will be either 1 or -1, signifying direction of movement
-                    self.unit_direction_array = np.ones(len(self.optimized_rotations))
-
-                    # Highlight gate being operated on
-                    cur_wire_num = rotation_gate_nodes[self.cur_rotation_num].wire_num
-                    cur_column_num = rotation_gate_nodes[self.cur_rotation_num].column_num
-                    self.circuit_grid.highlight_selected_node(cur_wire_num, cur_column_num)
-                    if self.frequent_viz_update:
-                        self.circ_viz_dirty = True
-
-                    self.rotation_initialized = True
-
-                    # Decide whether to increase or decrease angle
-                    self.unit_direction_array[self.cur_rotation_num] = 1
-                    if self.cur_ang_rad > np.pi:
-                        self.unit_direction_array[self.cur_rotation_num] = -1
-                    self.proposed_cur_ang_rad += move_radians * self.unit_direction_array[self.cur_rotation_num]
-                    if 0.0 <= self.proposed_cur_ang_rad < np.pi * 2 + 0.01:
-                        self.optimized_rotations[self.cur_rotation_num] = self.proposed_cur_ang_rad
-
-                        temp_distance = objective_function(circuit_grid, expectation_grid, rotation_gate_nodes)
-                        if temp_distance > self.min_distance:
-                            # Moving in the wrong direction so restore the angle in the array and switch direction
-                            self.optimized_rotations[self.cur_rotation_num] = self.cur_ang_rad
-                            self.unit_direction_array[self.cur_rotation_num] *= -1
-                        else:
-                            # Moving in the right direction so use the proposed angle
-                            self.cur_ang_rad = self.proposed_cur_ang_rad
-                            self.min_distance = temp_distance
-
-                        self.finished_rotating = False
-                        self.rotation_iterations = 0
-
-                elif self.rotation_initialized and not self.finished_rotating:
-                    self.rotation_iterations += 1
-                    self.proposed_cur_ang_rad += move_radians * self.unit_direction_array[self.cur_rotation_num]
-                    if 0.0 <= self.proposed_cur_ang_rad <= np.pi * 2 + 0.01:
-                        self.optimized_rotations[self.cur_rotation_num] = self.proposed_cur_ang_rad
-                        temp_distance = objective_function(circuit_grid, expectation_grid, rotation_gate_nodes)
-
-                        if temp_distance >= self.min_distance: # TODO: Better?
-                        # if temp_distance > self.min_distance:
-                            # Distance is increasing so restore the angle in the array and leave the loop
-                            self.optimized_rotations[self.cur_rotation_num] = self.cur_ang_rad
-                            self.finished_rotating = True
-                            self.cur_rotation_num += 1
-                            self.rotation_initialized = False
-                        elif self.rotation_iterations > np.pi * 2 / move_radians:
-                            print("Unexpected: self.rotation_iterations: ",  self.rotation_iterations)
-                            self.finished_rotating = True
-                            self.cur_rotation_num += 1
-                            self.rotation_initialized = False
-                        else:
-                            # Distance is not increasing, so use the proposed angle
-                            self.cur_ang_rad = self.proposed_cur_ang_rad
-                            self.min_distance = temp_distance
-                            if self.frequent_viz_update:
-                                self.circ_viz_dirty = True
-                    else:
-                        self.finished_rotating = True
-                        self.cur_rotation_num += 1
-                        self.rotation_initialized = False
-
-                # self.cur_rotation_num += 1
-            else:
-                self.cur_rotation_num = 0
-                self.cur_optimization_epoch += 1
-                # print('self.min_distance: ', self.min_distance)
-
-            objective_function(circuit_grid, expectation_grid, rotation_gate_nodes)
-            # print('exp_val: ', expectation_grid.calc_expectation_value())
-
-
-    def expectation_value_objective_function(self, circuit_grid,
-                                             expectation_grid, rotation_gate_nodes):
-        for idx in range(len(rotation_gate_nodes)):
-            circuit_grid.rotate_gate_absolute(rotation_gate_nodes[idx], self.optimized_rotations[idx])
-        expectation_grid.set_circuit(circuit_grid.circuit_grid_model.compute_circuit())
-        cost, basis_state = expectation_grid.calc_expectation_value()
-
-        # print("self.optimized_rotations: ", self.optimized_rotations, ", cost: ", cost, ", basis_state: ", basis_state)
-        return cost
+        self.finish_event_session()
+        pygame.quit()
 
+    def start_optimization(self):
+        optimizer_class = OPTIMIZERS[OPTIMIZER_NAME]
+        num_rotations = len(self.circuit_grid_model.get_rotation_gate_nodes())
+
+        # Every rotation starts at pi, except for gradient-based optimizers that can't move from there
+        initial_rotations = initial_rotations_for_start(num_rotations, 0, None,
+                                                        random_first=optimizer_class.uses_gradient)
+        self.background_optimizer = BackgroundOptimizer(optimizer_class(initial_rotations),
+                                                        self.circuit_grid_model.get_gate_tape(),
+                                                        self.expectation_grid.eigenvalues)
+        self.background_optimizer.start()
+        self.optimization_structure_version = self.circuit_grid_model.structure_version
+
+    def start_multistart_optimization(self):
+        self.multistart_optimizer = MultiStartOptimizer(self.circuit_grid_model.get_gate_tape(),
+                                                        self.expectation_grid.eigenvalues)
+        self.multistart_optimizer.start()
+        self.optimization_structure_version = self.circuit_grid_model.structure_version
+
+    def stop_optimization(self):
+        """Stop any running optimizer, discarding results it hasn't reported yet"""
+        if self.background_optimizer:
+            self.background_optimizer.stop()
+            self.background_optimizer = None
+        if self.multistart_optimizer:
+            self.multistart_optimizer.shutdown()
+            self.multistart_optimizer = None
+        self.set_optimize_button_enabled(True)
+
+    def apply_rotations(self, rotations):
+        """Set the angles of the rotation gates, ordered as in get_rotation_gate_nodes"""
+        self.circuit_grid_model.set_rotation_angles(rotations)
+
+        # Update the grid once, rather than once per gate
+        self.circuit_grid.update()
+
+    @profiled('VQEPlayground.update_circ_viz')
     def update_circ_viz(self):
         # print("in update_circ_viz")
-        self.screen.blit(self.background, (0, 0))
-        circuit = self.circuit_grid_model.compute_circuit()
-        self.expectation_grid.set_circuit(circuit)
-        self.top_sprites.arrange()
-        self.right_sprites.arrange()
-        self.top_sprites.draw(self.screen)
-        self.right_sprites.draw(self.screen)
-        self.adjacency_matrix.arrange()
-        self.adjacency_matrix.draw(self.screen)
-        self.circuit_grid.draw(self.screen)
-        pygame.display.flip()
+        # Nothing needs simulating when the circuit hasn't changed, for instance after an adjacency edit
+        circuit_version = self.circuit_grid_model.get_version()
+        if circuit_version != self.circ_viz_version:
+            self.expectation_grid.set_statevector(self.circuit_grid_model.compute_statevector())
+            self.circ_viz_version = circuit_version
+        self.dirty_panels.update((self.circuit_grid, self.expectation_grid))
+
+    @profiled('VQEPlayground.redraw_dirty_panels')
+    def redraw_dirty_panels(self):
+        """Redraw the regions of the screen covered by dirty panels, and update only those regions.
+
+        A panel's region includes where it was last drawn, in case it has
+        moved or shrunk. Panels that overlap a redrawn region are drawn again
+        too, in panel order, so that they stay on top.
+        """
+        self.rearrange_resized_panels()
+
+        screen_rect = self.screen.get_rect()
+        dirty_rects = []
+        for panel in self.dirty_panels:
+            panel_rect = self.calc_panel_rect(panel)
+            if panel in self.panel_rects:
+                panel_rect = panel_rect.union(self.panel_rects[panel])
+            dirty_rects.append(panel_rect.clip(screen_rect))
+            self.screen.blit(self.background, dirty_rects[-1], dirty_rects[-1])
+
+        for panel in self.panels:
+            panel_rect = self.calc_panel_rect(panel)
+            if panel in self.dirty_panels or panel_rect.collidelist(dirty_rects) != -1:
+                self.draw_panel(panel)
+                self.panel_rects[panel] = panel_rect
+
+        pygame.display.update(dirty_rects)
+        self.dirty_panels.clear()
+
+    def rearrange_resized_panels(self):
+        """Arrange the sprites in a container again if any of them has changed size, marking its panels dirty"""
+        for container, arranged_sizes in self.arranged_sizes.items():
+            if [sprite.rect.size for sprite in container.sprites()] != arranged_sizes:
+                container.arrange()
+                self.arranged_sizes[container] = [sprite.rect.size for sprite in container.sprites()]
+                self.dirty_panels.update(panel for panel in self.panels
+                                         if panel is container or panel in container.sprites())
+
+    def calc_panel_rect(self, panel):
+        if isinstance(panel, pygame.sprite.AbstractGroup):
+            sprite_rects = [sprite.rect for sprite in panel.sprites()]
+            return sprite_rects[0].unionall(sprite_rects[1:])
+        return panel.rect
+
+    def draw_panel(self, panel):
+        if isinstance(panel, pygame.sprite.AbstractGroup):
+            panel.draw(self.screen)
+        else:
+            self.screen.blit(panel.image, panel.rect)
+
+    def set_optimize_button_enabled(self, enabled):
+        self.optimize_button.set_enabled(enabled)
+        self.dirty_panels.add(self.optimize_button)
+
+    def finish_event_session(self):
+        if self.event_recorder:
+            self.event_recorder.close()
+        if self.event_replay:
+            self.event_replay.print_report()
+            if self.latency_csv_path:
+                self.event_replay.latencies.write_csv(self.latency_csv_path)
+
+    def toggle_profiler(self):
+        self.profiler_overlay.set_visible(not self.profiler_overlay.visible)
+        # Timings are collected while they are shown, and all the time when VQE_PLAYGROUND_PROFILE is set
+        PROFILER.enabled = self.profiler_overlay.visible or PROFILER.enabled_by_environment
+        self.dirty_panels.add(self.profiler_overlay)
+
+    def write_profile(self):
+        path = 'vqe_playground_profile_' + time.strftime('%Y%m%d_%H%M%S') + '.csv'
+        PROFILER.write_csv(path)
+        print('Wrote stage timings to', path)
 
     def move_update_circuit_grid_display(self, direction):
         self.circuit_grid.move_to_adjacent_node(direction)
-        self.circuit_grid.draw(self.screen)
-        pygame.display.flip()
+        self.dirty_panels.add(self.circuit_grid)
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
 from vqe_playground.vqe_main import VQEPlayground
 
-VQEPlayground().main()
+if __name__ == "__main__":
+    VQEPlayground().main()